@@ -0,0 +1,560 @@
+"""
+Offline benchmark for the hot paths of engine.py.
+
+Runs on CPU with synthetic audio, so it needs no media files and no network:
+
+    python backend/benchmark.py                       # fake model, JSON to stdout
+    python backend/benchmark.py --real-model          # also load/run Whisper "tiny"
+    python backend/benchmark.py --out bench.json --save-baseline bench_baseline.json
+    python backend/benchmark.py --baseline bench_baseline.json --fail-on-regression
+
+Stages that need something missing here (ffmpeg for the decode stages,
+torch/whisper for --real-model) are reported as "skipped" with a reason
+instead of failing the run.
+
+Each stage reports the median wall time over --repeat runs, throughput in
+audio-seconds per wall-second where that makes sense, and the peak memory
+allocated during the stage (tracemalloc, which includes NumPy buffers).
+The process peak RSS is reported once at the end. A --baseline must have been
+recorded with the same --duration, --words and --real-model, and stages under
+5 ms in both runs are not compared (too noisy at any --repeat).
+
+Accuracy vs. speed of the inference engines (engine.INFERENCE_ENGINES) is
+measured on a fixed test set instead of synthetic audio:
+
+    python backend/benchmark.py --compare-engines testset/ --model professional --out engines.json
+
+`testset/` holds the media files and, for each of them, an optional reference
+transcript with the same name and a .txt extension. Every file is transcribed
+on CPU by every engine with the same thread settings (--cpu-threads). The
+report lists per file and in total: wall time, real-time factor (wall seconds
+per audio second), speed-up over "standard", the word error rate against the
+reference where there is one, and for other engines the word error rate
+against the "standard" output (how much the engine changes the transcript,
+which needs no references). Results depend on the CPU, so keep the report's
+"meta" block with any numbers you quote. The report's "testSet" lists every
+file with its duration and SHA-256, so two reports can be checked to cover
+the same set; --markdown also writes the results as Markdown tables.
+"""
+import os
+import sys
+import json
+import time
+import wave
+import hashlib
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import tracemalloc
+import re
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import engine  # noqa: E402
+
+SAMPLE_RATE = engine.SAMPLE_RATE
+WORDS_PER_SECOND = 2.5
+
+
+# --- SYNTHETIC INPUTS ---
+def synth_audio(seconds, seed=0):
+    """
+    Speech-like test signal: noise bursts with a syllable-rate envelope,
+    separated by pauses of varying length (some long enough to be "silence").
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    audio = rng.standard_normal(n).astype(np.float32) * 0.002
+
+    t = 0.0
+    while t < seconds:
+        talk = rng.uniform(2.0, 12.0)
+        s, e = int(t * SAMPLE_RATE), min(int((t + talk) * SAMPLE_RATE), n)
+        env = 0.5 + 0.5 * np.sin(2 * np.pi * 4.0 * np.arange(e - s) / SAMPLE_RATE)
+        audio[s:e] += rng.standard_normal(e - s).astype(np.float32) * 0.2 * env.astype(np.float32)
+        t += talk + rng.choice([0.3, 0.8, 2.5, 6.0])
+    np.clip(audio, -1.0, 1.0, out=audio)
+    return audio
+
+def write_wav(path, audio):
+    pcm = (audio * 32767.0).astype("<i2")
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(pcm.tobytes())
+
+def synth_result(n_words, seed=0):
+    """
+    A Whisper-shaped result with `n_words` word timestamps.
+    """
+    rng = np.random.default_rng(seed)
+    vocab = ["hello", "world", "this", "is", "a", "test", "of", "the", "subtitle",
+             "engine", "really", "shit", "quick", "brown", "fox", "jumps."]
+    segments = []
+    words = []
+    t = 0.0
+    for i in range(n_words):
+        dur = float(rng.uniform(0.15, 0.5))
+        words.append({"word": " " + vocab[i % len(vocab)], "start": round(t, 2),
+                      "end": round(t + dur, 2), "probability": 0.9})
+        t += dur + float(rng.uniform(0.02, 0.2))
+        if len(words) == 12 or i == n_words - 1:
+            segments.append({
+                "id": len(segments), "seek": 0,
+                "start": words[0]["start"], "end": words[-1]["end"],
+                "text": "".join(w["word"] for w in words),
+                "tokens": [], "temperature": 0.0, "avg_logprob": -0.2,
+                "compression_ratio": 1.4, "no_speech_prob": 0.01,
+                "words": words,
+            })
+            words = []
+            t += float(rng.choice([0.1, 0.4, 1.5]))
+    return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": "en"}
+
+
+class FakeWhisperModel:
+    """
+    Stands in for a Whisper model: returns a deterministic result sized to the
+    input (WORDS_PER_SECOND), so the pipeline around model.transcribe can be
+    timed without torch.
+    """
+    device = "cpu"
+
+    def transcribe(self, audio, **opts):
+        if isinstance(audio, str):
+            audio = engine.custom_load_audio(audio)
+        seconds = len(audio) / SAMPLE_RATE
+        result = synth_result(max(1, int(seconds * WORDS_PER_SECOND)))
+        scale = seconds / max(result["segments"][-1]["end"], 1e-6)
+        for seg in result["segments"]:
+            seg["start"] *= scale; seg["end"] *= scale
+            for w in seg["words"]:
+                w["start"] *= scale; w["end"] *= scale
+        return result
+
+
+# --- MEASUREMENT ---
+def _silence_engine():
+    # Engine status events would otherwise be printed between our JSON output
+    engine._event_tap = lambda payload: False
+
+def cpu_model():
+    """The CPU's marketing name where the OS exposes it, else the architecture."""
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+def peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+    except ImportError:
+        pass
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return round(counters.PeakWorkingSetSize / (1024 * 1024), 1)
+    except (AttributeError, OSError):
+        pass
+    return None
+
+def measure(fn, repeat, audio_seconds=None, setup=None):
+    """
+    Times `fn` `repeat` times (median), then runs it once more under
+    tracemalloc for the peak allocation. `setup` runs before every call and is
+    not timed.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup: setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+
+    if setup: setup()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    wall = statistics.median(times)
+    stage = {
+        "status": "ok",
+        "wallSeconds": round(wall, 6),
+        "runs": repeat,
+        "peakAllocMB": round(peak / (1024 * 1024), 2),
+    }
+    if audio_seconds:
+        stage["audioSeconds"] = audio_seconds
+        stage["throughput"] = round(audio_seconds / wall, 2) if wall > 0 else None
+    return stage
+
+def skipped(reason):
+    return {"status": "skipped", "reason": reason}
+
+
+# --- BENCHMARK ---
+def run_settings(args):
+    """The options that change what a run measures; a baseline must match them."""
+    return {"audioSeconds": args.duration, "words": args.words, "realModel": bool(args.real_model)}
+
+def run(args):
+    _silence_engine()
+    stages = {}
+    work_dir = tempfile.mkdtemp(prefix="v2s_bench_")
+
+    if args.ffmpeg:
+        engine.FFMPEG_PATH = args.ffmpeg
+    has_ffmpeg = os.path.exists(engine.FFMPEG_PATH) or shutil.which(engine.FFMPEG_PATH) is not None
+
+    try:
+        audio = synth_audio(args.duration)
+        wav_path = os.path.join(work_dir, "synthetic.wav")
+        write_wav(wav_path, audio)
+        # Same PCM, non-.wav name: forces custom_load_audio through ffmpeg
+        media_path = os.path.join(work_dir, "synthetic.media")
+        shutil.copyfile(wav_path, media_path)
+        seconds = round(len(audio) / SAMPLE_RATE, 3)
+
+        # 1. Audio loading / extraction
+        stages["load_wav_mono_16k"] = measure(lambda: engine.load_wav_mono_16k(wav_path), args.repeat, seconds)
+        if has_ffmpeg:
+            stages["custom_load_audio"] = measure(lambda: engine.custom_load_audio(media_path), args.repeat, seconds)
+
+            def extract():
+                temp = engine.extract_audio_silent(media_path)
+                if temp and os.path.exists(temp): os.remove(temp)
+            stages["extract_audio_silent"] = measure(extract, args.repeat, seconds)
+        else:
+            stages["custom_load_audio"] = skipped("ffmpeg not found (use --ffmpeg)")
+            stages["extract_audio_silent"] = skipped("ffmpeg not found (use --ffmpeg)")
+
+        # 2. Model load + inference
+        model = FakeWhisperModel()
+        stages["transcribe_fake"] = measure(lambda: model.transcribe(audio), args.repeat, seconds)
+
+        if args.real_model:
+            try:
+                engine._ensure_ml_imports()
+            except ImportError as e:
+                stages["load_ai_model_cold"] = skipped(f"torch/whisper not installed ({e})")
+                stages["load_ai_model_warm"] = skipped("torch/whisper not installed")
+                stages["transcribe_tiny"] = skipped("torch/whisper not installed")
+            else:
+                def clear_pool():
+                    engine._model_pool.clear()
+                stages["load_ai_model_cold"] = measure(
+                    lambda: engine.load_ai_model("lightning", "cpu"), max(1, args.repeat // 2), setup=clear_pool
+                )
+                stages["load_ai_model_warm"] = measure(lambda: engine.load_ai_model("lightning", "cpu"), args.repeat)
+
+                tiny = engine.load_ai_model("lightning", "cpu")
+                opts = {"word_timestamps": True, "verbose": None, "language": "en"}
+                stages["transcribe_tiny"] = measure(lambda: tiny.transcribe(audio, **opts), 1, seconds)
+        else:
+            for name in ("load_ai_model_cold", "load_ai_model_warm", "transcribe_tiny"):
+                stages[name] = skipped("run with --real-model")
+
+        # 3. Output formatting, on a transcript of --words words
+        result = synth_result(args.words)
+        for fmt in ("srt", "vtt", "txt"):
+            for preset in ("standard", "tiktok"):
+                if fmt == "txt" and preset == "tiktok": continue  # presets don't apply to TXT
+                stages[f"generate_output_{fmt}_{preset}"] = measure(
+                    lambda f=fmt, p=preset: engine.generate_output(result, f, p, 42, 2, True), args.repeat
+                )
+                stages[f"generate_output_{fmt}_{preset}"]["words"] = args.words
+        reflow = engine.reflow_settings({"reflow": True})
+        stages["generate_output_srt_reflow"] = measure(
+            lambda: engine.generate_output(result, "srt", "standard", 42, 2, True, reflow), args.repeat
+        )
+        stages["generate_output_srt_reflow"]["words"] = args.words
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpuCount": os.cpu_count(),
+            **run_settings(args),
+        },
+        "stages": stages,
+        "peakRssMB": peak_rss_mb(),
+    }
+
+# --- ENGINE COMPARISON (ACCURACY VS SPEED) ---
+TEST_SET_EXTENSIONS = (".wav", ".mp3", ".m4a", ".flac", ".ogg", ".mp4", ".mkv", ".mov", ".webm")
+
+def normalize_words(text):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+def word_error_rate(reference, hypothesis):
+    """
+    (substitutions + deletions + insertions) / reference words, on lowercased
+    words without punctuation.
+    """
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    if not ref: return 0.0 if not hyp else 1.0
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1] / len(ref)
+
+def load_test_set(folder):
+    """Sorted (media path, reference text or None) pairs from `folder`."""
+    items = []
+    for name in sorted(os.listdir(folder)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() not in TEST_SET_EXTENSIONS: continue
+        ref_path = os.path.join(folder, stem + ".txt")
+        reference = None
+        if os.path.exists(ref_path):
+            with open(ref_path, "r", encoding="utf-8") as f:
+                reference = f.read()
+        items.append((os.path.join(folder, name), reference))
+    return items
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def compare_engines(args):
+    """
+    Transcribes the test set with every engine in engine.INFERENCE_ENGINES on
+    CPU and reports speed and word error rate per engine.
+    """
+    _silence_engine()
+    if args.ffmpeg:
+        engine.FFMPEG_PATH = args.ffmpeg
+    items = load_test_set(args.compare_engines)
+    if not items:
+        return {"status": "skipped", "reason": f"no media files in {args.compare_engines}"}
+    try:
+        engine._ensure_ml_imports()
+    except ImportError as e:
+        return {"status": "skipped", "reason": f"torch/whisper not installed ({e})"}
+
+    engine.configure_cpu_threads(args.cpu_threads, 1)
+    audio = [(path, reference, engine.custom_load_audio(path)) for path, reference in items]
+    opts = {"word_timestamps": True, "verbose": None, "fp16": False}
+    if args.language: opts["language"] = args.language
+
+    engines = {}
+    texts = {}
+    for name in engine.INFERENCE_ENGINES:
+        engine._model_pool.clear()
+        t0 = time.perf_counter()
+        model = engine.load_ai_model(args.model, "cpu", engine=name)
+        load_seconds = time.perf_counter() - t0
+
+        files = []
+        for path, reference, samples in audio:
+            t0 = time.perf_counter()
+            text = model.transcribe(samples, **opts)["text"]
+            wall = time.perf_counter() - t0
+            seconds = len(samples) / SAMPLE_RATE
+            texts[(name, path)] = text
+            stats = {
+                "file": os.path.basename(path),
+                "audioSeconds": round(seconds, 2),
+                "wallSeconds": round(wall, 3),
+                "rtf": round(wall / seconds, 4) if seconds else None,
+                "wer": round(word_error_rate(reference, text), 4) if reference is not None else None,
+            }
+            if name != engine.DEFAULT_ENGINE:
+                # How much the transcript changes against float32 (works without references)
+                stats["werVsStandard"] = round(word_error_rate(texts[(engine.DEFAULT_ENGINE, path)], text), 4)
+            files.append(stats)
+
+        audio_total = sum(f["audioSeconds"] for f in files)
+        wall_total = sum(f["wallSeconds"] for f in files)
+        wers = [f["wer"] for f in files if f["wer"] is not None]
+        engines[name] = {
+            "loadSeconds": round(load_seconds, 3),
+            "audioSeconds": round(audio_total, 2),
+            "wallSeconds": round(wall_total, 3),
+            "rtf": round(wall_total / audio_total, 4) if audio_total else None,
+            "meanWer": round(sum(wers) / len(wers), 4) if wers else None,
+            "files": files,
+        }
+        if name != engine.DEFAULT_ENGINE:
+            engines[name]["meanWerVsStandard"] = round(sum(f["werVsStandard"] for f in files) / len(files), 4)
+
+    base = engines[engine.DEFAULT_ENGINE]["wallSeconds"]
+    for stats in engines.values():
+        stats["speedup"] = round(base / stats["wallSeconds"], 2) if stats["wallSeconds"] else None
+    return {
+        "status": "ok",
+        "model": args.model,
+        "cpuThreads": engine.torch.get_num_threads(),
+        "files": len(items),
+        "testSet": [
+            {"file": os.path.basename(path), "audioSeconds": round(len(samples) / SAMPLE_RATE, 2),
+             "sha256": file_sha256(path), "reference": reference is not None}
+            for path, reference, samples in audio
+        ],
+        "engines": engines,
+    }
+
+def engines_markdown(report):
+    """The engine comparison of `report` as Markdown tables (test set, totals, per file)."""
+    meta, result = report["meta"], report["engineComparison"]
+    if result.get("status") != "ok":
+        return f"Not measured: {result.get('reason')}\n"
+    fmt = lambda v: "n/a" if v is None else v
+    lines = [
+        f"Model: {result['model']} | CPU: {meta['cpu']} ({meta['cpuCount']} logical cores, "
+        f"{result['cpuThreads']} threads) | {meta['platform']} | Python {meta['python']} | {meta['timestamp']}",
+        "",
+        "| File | Audio (s) | Reference | SHA-256 |",
+        "| --- | ---: | --- | --- |",
+    ]
+    lines += [f"| {f['file']} | {f['audioSeconds']} | {'yes' if f['reference'] else 'no'} | `{f['sha256'][:16]}` |"
+              for f in result["testSet"]]
+    lines += ["", "| Engine | Load (s) | Wall (s) | RTF | Speed-up | Mean WER | Mean WER vs standard |",
+              "| --- | ---: | ---: | ---: | ---: | ---: | ---: |"]
+    for name, stats in result["engines"].items():
+        lines.append(f"| {name} | {stats['loadSeconds']} | {stats['wallSeconds']} | {fmt(stats['rtf'])} | "
+                     f"{fmt(stats['speedup'])} | {fmt(stats['meanWer'])} | {fmt(stats.get('meanWerVsStandard'))} |")
+    lines += ["", "| File | Engine | Wall (s) | RTF | WER | WER vs standard |", "| --- | --- | ---: | ---: | ---: | ---: |"]
+    for name, stats in result["engines"].items():
+        for f in stats["files"]:
+            lines.append(f"| {f['file']} | {name} | {f['wallSeconds']} | {fmt(f['rtf'])} | "
+                         f"{fmt(f['wer'])} | {fmt(f.get('werVsStandard'))} |")
+    return "\n".join(lines) + "\n"
+
+MIN_COMPARED_SECONDS = 0.005  # faster stages are mostly timer noise
+
+def baseline_mismatch(settings, baseline):
+    """Settings (see run_settings) that differ from the ones `baseline` was recorded with."""
+    meta = baseline.get("meta", {})
+    return {k: {"run": v, "baseline": meta.get(k)} for k, v in settings.items() if meta.get(k) != v}
+
+def compare(report, baseline, threshold):
+    """
+    Flags every stage whose wall time grew by more than `threshold` (a ratio,
+    0.15 = 15%) against the same stage in `baseline`. Stages faster than
+    MIN_COMPARED_SECONDS in both runs are not compared.
+    """
+    regressions = []
+    for name, stage in report["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if stage.get("status") != "ok" or not base or base.get("status") != "ok":
+            continue
+        if max(stage["wallSeconds"], base["wallSeconds"]) < MIN_COMPARED_SECONDS:
+            stage["baselineWallSeconds"] = base["wallSeconds"]
+            stage["ratio"] = None  # too fast to compare
+            continue
+        ratio = stage["wallSeconds"] / base["wallSeconds"] if base["wallSeconds"] else None
+        stage["baselineWallSeconds"] = base["wallSeconds"]
+        stage["ratio"] = round(ratio, 3) if ratio is not None else None
+        if ratio is not None and ratio > 1.0 + threshold:
+            regressions.append({"stage": name, "ratio": stage["ratio"],
+                                "wallSeconds": stage["wallSeconds"], "baselineWallSeconds": base["wallSeconds"]})
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark VideoToSRT engine hot paths (CPU, offline).")
+    parser.add_argument("--duration", type=float, default=120.0, help="synthetic audio length in seconds")
+    parser.add_argument("--words", type=int, default=10000, help="transcript size for generate_output")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per stage (median is reported)")
+    parser.add_argument("--real-model", action="store_true", help="also load and run Whisper 'tiny' on CPU")
+    parser.add_argument("--ffmpeg", help="ffmpeg binary to use instead of backend/bin/ffmpeg.exe")
+    parser.add_argument("--out", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="compare against this earlier report")
+    parser.add_argument("--save-baseline", help="also write the report here as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown before a regression is flagged")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on regressions")
+    parser.add_argument("--compare-engines", metavar="DIR", help="compare the inference engines on the test set in DIR")
+    parser.add_argument("--model", default="standard", help="model alias for --compare-engines (e.g. professional)")
+    parser.add_argument("--language", help="language for --compare-engines (default: detect)")
+    parser.add_argument("--cpu-threads", type=int, help="intra-op threads for --compare-engines")
+    parser.add_argument("--markdown", help="with --compare-engines, also write the results as Markdown tables here")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline and not args.compare_engines:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        mismatch = baseline_mismatch(run_settings(args), baseline)
+        if mismatch:
+            parser.error(f"{args.baseline} was recorded with other settings, rerun with them: "
+                         + ", ".join(f"{k}={v['baseline']} (not {v['run']})" for k, v in mismatch.items()))
+
+    if args.compare_engines:
+        report = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu": cpu_model(),
+                "cpuCount": os.cpu_count(),
+            },
+            "engineComparison": compare_engines(args),
+        }
+        if args.markdown:
+            with open(args.markdown, "w", encoding="utf-8") as f:
+                f.write(engines_markdown(report))
+    else:
+        report = run(args)
+
+    if baseline is not None:
+        report["regressions"] = compare(report, baseline, args.threshold)
+        report["baseline"] = args.baseline
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    if args.fail_on_regression and report.get("regressions"):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
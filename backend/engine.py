@@ -1,18 +1,32 @@
 import sys
+import time
 import json
 import os
-import torch
-import whisper
+import threading
 import warnings
-import datetime
 import subprocess
-import base64
 import re
 import wave
+import gc
+import types
+import importlib
+import contextlib
+import itertools
+import math
 import numpy as np
+from collections import OrderedDict
 
 warnings.filterwarnings("ignore")
 
+_PROCESS_START = time.perf_counter()
+
+# torch/whisper are imported lazily (see _ensure_ml_imports) so the engine can
+# answer "analyze" right away; they take seconds to import in the frozen build.
+torch = None
+whisper = None
+_ml_import_lock = threading.Lock()
+startup_timings = {}
+
 # --- CONFIGURATION ---
 if getattr(sys, 'frozen', False):
     # FROZEN (EXE) MODE
@@ -28,6 +42,8 @@ BIN_DIR = os.path.join(BASE_DIR, "bin")
 FFMPEG_PATH = os.path.join(BIN_DIR, "ffmpeg.exe")
 FFPROBE_PATH = os.path.join(BIN_DIR, "ffprobe.exe")
 
+SAMPLE_RATE = 16000  # same as whisper.audio.SAMPLE_RATE
+
 os.environ["PATH"] += os.pathsep + BIN_DIR
 
 MODEL_MAP = {
@@ -38,16 +54,100 @@ MODEL_MAP = {
     "studio": "large"
 }
 
+# Approximate memory needed per loaded model (MB), from the Whisper model card.
+# Used as the backpressure limit when several worker processes each hold a model.
+MODEL_RAM_MB = {
+    "tiny": 1000,
+    "base": 1000,
+    "small": 2000,
+    "medium": 5000,
+    "large": 10000
+}
+
+# Inference engines a request can pick with "engine" (unknown ones run on the
+# default). A quantized CPU engine only joins once it has been measured
+# against this one (benchmark.py --compare-engines).
+INFERENCE_ENGINES = ("standard",)
+DEFAULT_ENGINE = "standard"
+
 current_model = None
 loaded_model_name = None
 loaded_device = None
 
+# Resident models, keyed by (model name, device, engine); most recently used last.
+_model_pool = OrderedDict()
+_model_pool_lock = threading.RLock()
+_model_loading = {}  # key -> threading.Event while a load is in progress
+_model_users = {}    # key -> holds by jobs transcribing with it (see models_held); never evicted
+_model_released = threading.Condition(_model_pool_lock)
+# Memory budget (MB) for resident models per device; 0 = derive from free memory
+model_budget_mb = int(os.environ.get("V2S_MODEL_BUDGET_MB", "0"))
+_stdout_lock = threading.Lock()
+
+# Event routing of a batch worker process: events go through this queue to the
+# parent (which owns stdout). In-process routing is per thread (see event_route).
+_worker_route = None
+# Headless mode: callable(payload) -> bool that sees every event before it is
+# printed; returning False suppresses the line.
+_event_tap = None
+
+# Per-thread job state: .control (the Job being run, see job_checkpoint),
+# .progress_listener and .route (see event_route). Jobs run on their own
+# threads so they can be preempted, while commands are served on others.
+_job_local = threading.local()
+
 # --- UTILS ---
-def send_to_electron(type, message, data=None):
+def send_to_electron(type, message, data=None, **extra):
     payload = {"type": type, "message": message}
     if data: payload["data"] = data
-    print(json.dumps(payload))
-    sys.stdout.flush()
+    payload.update(extra)
+    route = _event_route()
+    if route is not None:
+        if route.path: payload["path"] = route.path
+        if route.track is not None: payload["audioTrack"] = route.track
+        if route.queue is not None:
+            route.queue.put(payload)
+            return
+    _emit(payload)
+
+def _event_route():
+    return getattr(_job_local, "route", None) or _worker_route
+
+@contextlib.contextmanager
+def event_route(**changes):
+    """
+    Routes the events this thread sends inside the with-block: through
+    `queue` (anything with put(payload), e.g. a batch's relay) and tagged with
+    the `path` and audio `track` being worked on. Fields not given are kept
+    from the current route. Other threads (the command reader, analysis) are
+    unaffected.
+    """
+    saved = getattr(_job_local, "route", None)
+    current = _event_route()
+    route = types.SimpleNamespace(queue=None, path=None, track=None)
+    if current is not None: route.__dict__.update(vars(current))
+    route.__dict__.update(changes)
+    _job_local.route = route
+    try:
+        yield route
+    finally:
+        _job_local.route = saved
+
+def _inherit_route(fn):
+    """Wraps `fn` to run with the calling thread's event route (for threads a job starts)."""
+    route = getattr(_job_local, "route", None)
+    if route is None: return fn
+    def run(*args, **kwargs):
+        with event_route(**vars(route)):
+            return fn(*args, **kwargs)
+    return run
+
+def _emit(payload):
+    if _event_tap is not None and not _event_tap(payload): return
+    # Background threads print too: keep each JSON line intact
+    with _stdout_lock:
+        print(json.dumps(payload))
+        sys.stdout.flush()
 
 def _subprocess_no_window_kwargs():
     """
@@ -62,18 +162,39 @@ def _subprocess_no_window_kwargs():
         kwargs["creationflags"] = 0x08000000  # CREATE_NO_WINDOW
     return kwargs
 
+PCM_CHUNK_SAMPLES = 1 << 20  # int16 samples converted per step (2 MB of PCM)
+_PCM_SCALE = np.float32(1.0 / 32768.0)  # exact power of two: same values as "/ 32768.0"
+
+def pcm16_to_float32(pcm, out):
+    """Converts int16 samples into the float32 array `out` (same length), without temporaries."""
+    return np.multiply(pcm, _PCM_SCALE, out=out)
+
+def _wav_data_offset(f):
+    """Byte offset of the PCM in the "data" chunk of an open RIFF/WAVE file."""
+    f.seek(12)
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            raise ValueError("WAV file has no data chunk")
+        size = int.from_bytes(header[4:], "little")
+        if header[:4] == b"data":
+            return f.tell()
+        f.seek(size + (size & 1), 1)  # chunks are word-aligned
+
 def load_wav_mono_16k(wav_path):
     """
     Loads a 16 kHz mono 16-bit PCM WAV file into a float32 NumPy array in [-1, 1].
     This is used for the temp WAVs created by extract_audio_silent() to avoid
     calling ffmpeg again from Whisper.
+    The PCM is read in PCM_CHUNK_SAMPLES pieces into one reused buffer and
+    converted straight into the preallocated result, so peak memory is the
+    float32 result plus one chunk instead of the raw bytes plus two copies.
     """
     with wave.open(wav_path, "rb") as wf:
         n_channels = wf.getnchannels()
         sampwidth = wf.getsampwidth()
         framerate = wf.getframerate()
         n_frames = wf.getnframes()
-        audio_bytes = wf.readframes(n_frames)
 
     # We expect: mono, 16-bit, 16 kHz
     if n_channels != 1 or sampwidth != 2 or framerate != 16000:
@@ -82,18 +203,27 @@ def load_wav_mono_16k(wav_path):
             f"sampwidth={sampwidth}, framerate={framerate}"
         )
 
-    audio_np = np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32) / 32768.0
-    return audio_np
+    audio_np = np.empty(n_frames, dtype=np.float32)
+    pcm = np.empty(min(n_frames, PCM_CHUNK_SAMPLES), dtype="<i2")
+    with open(wav_path, "rb") as f:
+        f.seek(_wav_data_offset(f))
+        pos = 0
+        while pos < n_frames:
+            view = pcm[:min(len(pcm), n_frames - pos)]
+            n = f.readinto(memoryview(view).cast("B")) // 2
+            if not n: break
+            pcm16_to_float32(view[:n], audio_np[pos:pos + n])
+            pos += n
+    return audio_np[:pos] if pos < n_frames else audio_np
 
 # --- MONKEYPATCH WHISPER'S LOAD_AUDIO TO USE OUR SILENT FFMPEG/WAV LOADER ---
-import whisper.audio as whisper_audio
-from whisper.audio import SAMPLE_RATE
-
-def custom_load_audio(audio, sr: int = SAMPLE_RATE):
+def custom_load_audio(audio, sr: int = SAMPLE_RATE, track=None):
     """
     Replacement for whisper.audio.load_audio that:
     - Uses ffmpeg with hidden console windows for generic media.
     - Uses a direct WAV reader for 16kHz mono temp WAVs created by extract_audio_silent.
+    - Decodes audio stream `track` (position among the file's audio streams)
+      instead of ffmpeg's default one when given.
     """
 
     # If it's already an array-like, just convert to float32 mono.
@@ -105,7 +235,7 @@ def custom_load_audio(audio, sr: int = SAMPLE_RATE):
         return arr
 
     # If this is our extracted temp WAV, load without ffmpeg.
-    if audio.lower().endswith(".wav"):
+    if track is None and audio.lower().endswith(".wav"):
         return load_wav_mono_16k(audio)
 
     # Generic path: use ffmpeg to decode (no console window)
@@ -115,6 +245,7 @@ def custom_load_audio(audio, sr: int = SAMPLE_RATE):
         "-hide_banner",
         "-loglevel", "error",
         "-i", audio,
+        *(["-map", f"0:a:{int(track)}"] if track is not None else []),
         "-f", "s16le",
         "-acodec", "pcm_s16le",
         "-ac", "1",
@@ -122,77 +253,326 @@ def custom_load_audio(audio, sr: int = SAMPLE_RATE):
         "-"
     ]
 
+    # The decoded PCM is converted chunk by chunk into one float32 buffer sized
+    # from the probed duration (grown if that was short), instead of holding
+    # all of stdout plus two full-size copies. stderr goes to a temp file so a
+    # chatty ffmpeg can't block on a full pipe while we read stdout.
+    import tempfile
+    duration = media_duration(audio)
+    capacity = int((duration or 60.0) * sr) + sr
+    audio_np = np.empty(capacity, dtype=np.float32)
+    pcm = np.empty(PCM_CHUNK_SAMPLES, dtype="<i2")
+    pcm_bytes = memoryview(pcm).cast("B")
+    pos = 0
+
     kwargs = _subprocess_no_window_kwargs()
-    proc = subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        **kwargs
-    )
-    out, err = proc.communicate()
-    if proc.returncode != 0:
-        raise RuntimeError(
-            f"ffmpeg error {proc.returncode}: {err.decode(errors='ignore')}"
+    with tempfile.TemporaryFile() as err:
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=err,
+            **kwargs
         )
-
-    audio_np = np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+        try:
+            while True:
+                n = _read_into(proc.stdout, pcm_bytes) // 2
+                if n:
+                    if pos + n > len(audio_np):
+                        grown = np.empty(max(pos + n, len(audio_np) + len(audio_np) // 4), dtype=np.float32)
+                        grown[:pos] = audio_np[:pos]
+                        audio_np = grown
+                    pcm16_to_float32(pcm[:n], audio_np[pos:pos + n])
+                    pos += n
+                if n < len(pcm): break
+        finally:
+            pcm_bytes.release()
+            proc.stdout.close()
+            returncode = proc.wait()
+
+        if returncode != 0:
+            err.seek(0)
+            raise RuntimeError(
+                f"ffmpeg error {returncode}: {err.read().decode(errors='ignore')}"
+            )
+
+    # Give back the unused tail (shrinks in place when nothing else references it)
+    audio_np.resize(pos, refcheck=False)
     return audio_np
 
-# Apply monkeypatch so all Whisper transcribes go through our loader
-whisper_audio.load_audio = custom_load_audio
+def _ensure_ml_imports():
+    """
+    Imports torch and whisper on first use (thread-safe) and applies the
+    load_audio monkeypatch. Import times are recorded in startup_timings.
+    """
+    global torch, whisper
+    if whisper is not None: return
+    with _ml_import_lock:
+        if whisper is not None: return
+
+        t0 = time.perf_counter()
+        import torch as _torch
+        t1 = time.perf_counter()
+        import whisper as _whisper
+        import whisper.audio as whisper_audio
+        t2 = time.perf_counter()
+
+        # Apply monkeypatch so all Whisper transcribes go through our loader
+        whisper_audio.load_audio = custom_load_audio
+        # ...and report their per-window progress to us instead of drawing tqdm
+        # (whisper.transcribe is shadowed by the function of the same name; get the module)
+        importlib.import_module("whisper.transcribe").tqdm = types.SimpleNamespace(tqdm=_TranscribeProgressBar)
+
+        startup_timings["torchImport"] = round((t1 - t0) * 1000)
+        startup_timings["whisperImport"] = round((t2 - t1) * 1000)
+        torch = _torch
+        whisper = _whisper  # set last: other threads use it as the "ready" flag
 
 def get_device(pref="auto"):
     if pref == "cpu": return "cpu"
+    _ensure_ml_imports()
     if pref == "cuda" and torch.cuda.is_available(): return "cuda"
     # Auto logic
     return "cuda" if torch.cuda.is_available() else "cpu"
 
-def load_ai_model(model_alias, device_pref):
+def _model_budget_mb(device):
+    """
+    Memory the pool may use on `device`: the configured budget, or 80% of
+    what is free plus what the pool already holds there.
+    """
+    if model_budget_mb: return model_budget_mb
+    held = sum(MODEL_RAM_MB.get(name, MODEL_RAM_MB["base"])
+               for name, dev, _ in list(_model_pool) + list(_model_loading) if dev == device)
+    free_mb = _available_memory_mb(device)
+    if free_mb is None:
+        return held + MODEL_RAM_MB["large"]
+    return int((free_mb + held) * 0.8)
+
+def _evict_models(device, needed_mb, keep_mru=False):
+    """
+    Drops least recently used models on `device` until `needed_mb` more fits in
+    the budget. Models that are in use (held by a job, even a preempted one)
+    or still loading count as used but are never evicted; with `keep_mru`,
+    neither is the most recently used model. Returns False if the new model
+    can't fit. Caller holds _model_pool_lock.
+    """
+    budget = _model_budget_mb(device)
+    keys = [k for k in _model_pool if k[1] == device]
+    loading = [k for k in _model_loading if k[1] == device]
+    used = sum(MODEL_RAM_MB.get(name, MODEL_RAM_MB["base"]) for name, _, _ in keys + loading)
+    protected = [k for k in keys if _model_users.get(k)] + (keys[-1:] if keep_mru else [])
+
+    for key in keys:
+        if used + needed_mb <= budget: break
+        if key in protected: continue
+        del _model_pool[key]
+        used -= MODEL_RAM_MB.get(key[0], MODEL_RAM_MB["base"])
+        send_to_electron("info", f"Unloaded model: {key[0]} ({key[1].upper()})")
+
+    gc.collect()
+    if device == "cuda": torch.cuda.empty_cache()
+    return used + needed_mb <= budget
+
+def _model_key(model_alias, device_pref, engine=DEFAULT_ENGINE):
+    """The pool key (model name, device, engine) a request's model is stored under."""
+    device = get_device(device_pref)
+    return (MODEL_MAP.get(model_alias, "base"), device, resolve_engine(engine, device))
+
+def _hold_model(key):
+    # Caller holds _model_pool_lock
+    _model_users[key] = _model_users.get(key, 0) + 1
+    _job_local.__dict__.setdefault("held_models", []).append(key)
+
+@contextlib.contextmanager
+def models_held():
+    """
+    Models loaded with `hold` inside the block stay in the pool until it ends,
+    also while the job is paused. Usable as a decorator.
+    """
+    held = _job_local.__dict__.setdefault("held_models", [])
+    mark = len(held)
+    try:
+        yield
+    finally:
+        with _model_pool_lock:
+            for key in held[mark:]:
+                _model_users[key] -= 1
+                if not _model_users[key]: del _model_users[key]
+            del held[mark:]
+            _model_released.notify_all()
+
+def _blocked_by_held_models(device):
+    # Whether models held by other threads are what keeps a load from fitting
+    mine = getattr(_job_local, "held_models", [])
+    return any(n > mine.count(k) for k, n in _model_users.items() if k[1] == device)
+
+def load_ai_model(model_alias, device_pref, background=False, engine=DEFAULT_ENGINE, hold=False):
+    """
+    Returns a loaded Whisper model, reusing it from the pool when possible.
+    Several models stay resident; the least recently used ones are evicted
+    once the memory budget for the device would be exceeded.
+    With `background`, nothing already in use is evicted and status events
+    are not sent (used for preloading the next job's model). Otherwise, if
+    only models held by other jobs are in the way, waits until they are
+    released. With `hold`, the model is held for the enclosing models_held().
+    """
     global current_model, loaded_model_name, loaded_device
-    
-    real_name = MODEL_MAP.get(model_alias, "base")
-    target_device = get_device(device_pref)
 
-    # Check if we already have this model on this device
-    if (current_model and 
-        loaded_model_name == real_name and 
-        loaded_device == target_device):
-        return current_model
+    _ensure_ml_imports()
+    key = _model_key(model_alias, device_pref, engine)
+    real_name, target_device, engine = key
 
-    send_to_electron("status", f"Loading AI Model: {model_alias.title()} ({target_device.upper()})...")
+    while True:
+        with _model_pool_lock:
+            model = _model_pool.get(key)
+            if model is not None:
+                # Check if we already have this model on this device
+                _model_pool.move_to_end(key)
+                if not background:
+                    current_model, loaded_model_name, loaded_device = model, real_name, target_device
+                    if hold: _hold_model(key)
+                return model
+
+            loading = _model_loading.get(key)
+            if loading is None:
+                needed = MODEL_RAM_MB.get(real_name, MODEL_RAM_MB["base"])
+                if not _evict_models(target_device, needed, keep_mru=background):
+                    if background:
+                        return None
+                    if _blocked_by_held_models(target_device):
+                        _model_released.wait()
+                        continue
+                loading = _model_loading[key] = threading.Event()
+                break
+
+        # Someone else (e.g. a preload) is loading this model: wait for it
+        loading.wait()
+        if background: return _model_pool.get(key)
+
+    label = target_device.upper()
+    if background:
+        send_to_electron("info", f"Preloading AI Model: {model_alias.title()} ({label})")
+    else:
+        send_to_electron("status", f"Loading AI Model: {model_alias.title()} ({label})...")
     try:
-        current_model = whisper.load_model(real_name, device=target_device)
-        loaded_model_name = real_name
-        loaded_device = target_device
-        send_to_electron("status", "Model Loaded. Ready.")
-        return current_model
+        model = whisper.load_model(real_name, device=target_device)
+        with _model_pool_lock:
+            _model_pool[key] = model
+            if not background:
+                current_model, loaded_model_name, loaded_device = model, real_name, target_device
+                if hold: _hold_model(key)
+        if not background:
+            _remember_last_model(model_alias, device_pref)
+            send_to_electron("status", "Model Loaded. Ready.")
+        return model
     except Exception as e:
-        send_to_electron("error", f"Failed to load model: {str(e)}")
+        if not background:
+            # Kept for the job that asked, which reports it against its file
+            _job_local.load_error = f"Failed to load model: {str(e)}"
+            send_to_electron("error", _job_local.load_error)
         return None
+    finally:
+        with _model_pool_lock:
+            _model_loading.pop(key, None)
+            _model_released.notify_all()
+        loading.set()
+
+def configure_model_pool(args):
+    """
+    Applies the optional "modelBudgetMB" setting of a command (the memory
+    budget of the model pool).
+    """
+    global model_budget_mb
+    if args.get("modelBudgetMB") is not None:
+        model_budget_mb = max(0, int(args["modelBudgetMB"]))
+
+def preload_next_model(args):
+    """
+    Starts preloading the next job's model: "nextModel" (+ "nextDevice",
+    "nextEngine") if the command names it, else the model of the job at the
+    head of the engine's own queue. Jobs call this once their own model is
+    loaded, so the two loads never compete for the budget.
+    """
+    if args.get("nextModel"):
+        preload_model(
+            args["nextModel"],
+            args.get("nextDevice", args.get("device", "auto")),
+            args.get("nextEngine", args.get("engine", DEFAULT_ENGINE))
+        )
+        return
+    with _jobs_cond:
+        job = _next_pending_job()
+    if job is not None:
+        data = job.data
+        preload_model(data.get("model", "standard"), data.get("device", "auto"), data.get("engine", DEFAULT_ENGINE))
+
+def preload_model(model_alias, device_pref="auto", engine=DEFAULT_ENGINE):
+    """
+    Loads a model into the pool on a background thread, e.g. the next queued
+    job's model while the current job is still transcribing.
+    """
+    thread = threading.Thread(
+        target=_inherit_route(load_ai_model),
+        args=(model_alias, device_pref),
+        kwargs={"background": True, "engine": engine},
+        daemon=True
+    )
+    thread.start()
+    return thread
+
+# --- INFERENCE ENGINES & CPU THREADS ---
+_interop_threads_set = False
+
+def resolve_engine(engine, device):
+    """The engine a request actually runs on `device`: unknown engines fall back to the default."""
+    return engine if engine in INFERENCE_ENGINES else DEFAULT_ENGINE
+
+def configure_cpu_threads(intra=None, interop=None):
+    """
+    Applies "cpuThreads" (intra-op: threads per matmul) and "interopThreads"
+    (parallel ops; Whisper's decoder is sequential, so 1 is enough). Torch
+    only accepts the inter-op setting once, before any parallel work has run.
+    """
+    global _interop_threads_set
+    _ensure_ml_imports()
+    if intra:
+        torch.set_num_threads(max(1, int(intra)))
+    if interop and not _interop_threads_set:
+        _interop_threads_set = True
+        try:
+            torch.set_num_interop_threads(max(1, int(interop)))
+        except RuntimeError:
+            send_to_electron("info", "Inter-op threads can only be set before the first transcription")
 
 def format_timestamp(seconds, fmt="srt"):
-    td = datetime.timedelta(seconds=seconds)
-    total_seconds = int(td.total_seconds())
+    # Integer math on microseconds, ~5x faster than a timedelta. Rounds like
+    # timedelta: only the fractional part, half to even (2.9999995 -> 2.999999)
+    frac, whole = math.modf(seconds)
+    carry, micros = divmod(round(frac * 1000000), 1000000)
+    total_seconds = int(whole) + carry
     hours = total_seconds // 3600
     minutes = (total_seconds % 3600) // 60
     secs = total_seconds % 60
-    millis = int(td.microseconds / 1000)
+    millis = micros // 1000
     
     if fmt == "vtt":
         return f"{hours:02}:{minutes:02}:{secs:02}.{millis:03}"
     return f"{hours:02}:{minutes:02}:{secs:02},{millis:03}"
 
 # --- HELPER: SILENT AUDIO EXTRACTION ---
-def extract_audio_silent(video_path):
+def extract_audio_silent(video_path, track=None):
     """
     Extracts audio to a temp .wav file using FFmpeg with NO window.
+    `track` selects an audio stream by its position among the file's audio
+    streams (audioTracks[].audioIndex in analysis results); default: ffmpeg's pick.
     """
     import tempfile
     temp_dir = tempfile.gettempdir()
-    temp_audio = os.path.join(temp_dir, f"v2s_temp_{os.getpid()}.wav")
+    # One file per job thread: a preempting job must not overwrite a paused one's
+    temp_audio = os.path.join(temp_dir, f"v2s_temp_{os.getpid()}_{threading.get_ident()}.wav")
 
     cmd = [
         FFMPEG_PATH, "-y", "-i", video_path,
+        *(["-map", f"0:a:{int(track)}"] if track is not None else []),
         "-vn", "-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1",
         temp_audio
     ]
@@ -210,247 +590,2827 @@ def extract_audio_silent(video_path):
     except:
         return None
 
-# --- ANALYSIS ENGINE ----
-def analyze_file(file_path):
-    if not os.path.exists(file_path):
-        send_to_electron("error", "File analysis failed: Not found")
-        return
+def extract_audio_tracks(video_path, tracks):
+    """
+    Extracts several audio streams to temp .wav files in ONE ffmpeg run, so the
+    input is read and demuxed once however many tracks are wanted.
+    Returns {track: wav path}, or None if extraction failed.
+    """
+    import tempfile
+    stem = os.path.join(tempfile.gettempdir(), f"v2s_temp_{os.getpid()}_{threading.get_ident()}")
+    outputs = {track: f"{stem}_a{track}.wav" for track in tracks}
+
+    cmd = [FFMPEG_PATH, "-y", "-i", video_path]
+    for track, temp_audio in outputs.items():
+        cmd += ["-map", f"0:a:{int(track)}", "-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1", temp_audio]
+
+    try:
+        subprocess.check_call(
+            cmd,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            **_subprocess_no_window_kwargs()
+        )
+        return outputs
+    except Exception:
+        for temp_audio in outputs.values():
+            if os.path.exists(temp_audio): os.remove(temp_audio)
+        return None
+
+# --- HELPER: STREAMING AUDIO DECODE (NO TEMP WAV) ---
+STREAM_WINDOW_SECONDS = 30
+STREAM_PREFETCH_WINDOWS = 2  # decoded windows waiting for the model
+STREAM_MIN_ADVANCE_SECONDS = 1.0
+
+def _read_into(stream, view):
+    """
+    Fills a writable memoryview from a pipe, looping over short reads.
+    Returns the number of bytes actually read (less than len(view) only at EOF).
+    """
+    total = 0
+    while total < len(view):
+        n = stream.readinto(view[total:])
+        if not n: break
+        total += n
+    return total
+
+def iter_pcm_windows(path, sr: int = SAMPLE_RATE, window_seconds=STREAM_WINDOW_SECONDS, start=0.0, track=None):
+    """
+    Decodes `path` with ffmpeg straight to s16le on stdout and yields float32
+    mono chunks of at most `window_seconds` as soon as they are decoded.
+    A helper thread drains the pipe into a queue of up to
+    STREAM_PREFETCH_WINDOWS windows, so ffmpeg keeps decoding while the
+    consumer transcribes the current one (an unread pipe fills after ~2 s of
+    audio and stalls ffmpeg). Nothing is written to disk.
+    Decoding begins `start` seconds into the file, from audio stream `track`
+    if given.
+    """
+    import queue
+    seek = ["-ss", f"{start:.3f}"] if start else []
+    cmd = [
+        FFMPEG_PATH,
+        "-nostdin",
+        "-hide_banner",
+        "-loglevel", "error",
+        *seek,
+        "-i", path,
+        *(["-map", f"0:a:{int(track)}"] if track is not None else []),
+        "-vn",
+        "-f", "s16le",
+        "-acodec", "pcm_s16le",
+        "-ac", "1",
+        "-ar", str(sr),
+        "-"
+    ]
 
-    # PREVENT CMD FLASHING
     kwargs = _subprocess_no_window_kwargs()
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        **kwargs
+    )
 
-    # Simple audio-only detection by file extension
-    ext = os.path.splitext(file_path)[1].lower()
-    audio_exts = {'.mp3', '.wav', '.m4a', '.aac', '.flac', '.ogg'}
+    windows = queue.Queue(maxsize=STREAM_PREFETCH_WINDOWS)
+    stop = threading.Event()
 
+    def put(item):
+        # Gives up once the consumer has stopped, instead of blocking forever
+        while not stop.is_set():
+            try:
+                windows.put(item, timeout=0.25)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read_windows():
+        raw = bytearray(int(window_seconds * sr) * 2)
+        view = memoryview(raw)
+        try:
+            while True:
+                n_bytes = _read_into(proc.stdout, view)
+                n_samples = n_bytes // 2
+                if n_samples:
+                    chunk = np.empty(n_samples, dtype=np.float32)
+                    if not put(pcm16_to_float32(np.frombuffer(raw, dtype=np.int16, count=n_samples), chunk)):
+                        return
+                if n_bytes < len(raw): break
+            put(None)
+        except Exception as e:
+            put(e)
+        finally:
+            view.release()
+
+    reader = threading.Thread(target=read_windows, name="pcm-reader", daemon=True)
+    reader.start()
+    completed = False
     try:
-        # 1. Get Duration via FFprobe
-        cmd = [
-            FFPROBE_PATH, "-v", "error", "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1", file_path
-        ]
+        while True:
+            item = windows.get()
+            if item is None: break
+            if isinstance(item, Exception): raise item
+            yield item
+        completed = True
+    finally:
+        stop.set()
+        # Consumer stopped early: don't leave ffmpeg blocked on a full pipe
+        if not completed and proc.poll() is None: proc.kill()
+        reader.join()
+        proc.stdout.close()
+        returncode = proc.wait()
+
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg error {returncode} while streaming audio")
+
+def _shift_segment(segment, offset, seg_id):
+    """
+    Moves a Whisper segment (and its words) `offset` seconds later on the timeline.
+    """
+    segment["id"] = seg_id
+    segment["start"] = round(segment["start"] + offset, 3)
+    segment["end"] = round(segment["end"] + offset, 3)
+    if "seek" in segment:
+        segment["seek"] = segment["seek"] + int(round(offset * 100))
+    for w in segment.get("words", []):
+        w["start"] = round(w["start"] + offset, 3)
+        w["end"] = round(w["end"] + offset, 3)
+    return segment
+
+def iter_streaming_segments(model, path, opts, state=None, vad=False, sr: int = SAMPLE_RATE):
+    """
+    Feeds ffmpeg's PCM output to Whisper one 30-second window at a time and
+    yields finalized segments (absolute timestamps) while decoding continues.
+
+    The last segment of each window may be cut by the window edge, so it is not
+    committed: its audio is carried over to the front of the next window instead.
+    The text of committed segments is passed on as the prompt for the next window,
+    which keeps Whisper's context across window boundaries.
+
+    With `vad`, only the speech inside each window is sent to Whisper (and
+    fully silent windows are skipped).
+
+    If a `state` dict is given, the detected language, the VAD statistics and
+    (once the stream is exhausted) the content hash and length of the decoded
+    audio are stored in it. A ProgressReporter in state["progress"] is told
+    about every window.
+
+    state["resume"] (a checkpoint, see TranscriptCheckpoint) starts decoding at
+    its offset with its prompt and language; there is no content hash then.
+    state["on_window"] is called after every window, once all of its
+    segments have been consumed. state["track"] selects the audio stream.
+    """
+    import hashlib
+    window_samples = STREAM_WINDOW_SECONDS * sr
+    min_advance = int(STREAM_MIN_ADVANCE_SECONDS * sr)
+    opts = dict(opts)
+    if state is None: state = {}
+
+    buffer = np.empty(window_samples, dtype=np.float32)
+    filled = 0
+    offset = 0.0
+    seg_id = 0
+    resume = state.get("resume")
+    if resume:
+        offset = resume["offset"]
+        seg_id = resume["segId"]
+        if resume.get("prompt"): opts["initial_prompt"] = resume["prompt"]
+        if resume.get("language") and "language" not in opts: opts["language"] = resume["language"]
+    chunks = iter_pcm_windows(path, sr, start=offset, track=state.get("track"))
+    pending = None  # decoded samples that did not fit into the current window
+    eof = False
+    # Skipped audio is never decoded on resume, so the hash would be wrong
+    digest = None if resume else hashlib.sha256()
 
-        duration_sec = float(subprocess.check_output(
-            cmd,
-            **kwargs
-        ).decode().strip())
+    while True:
+        # Top the window up with freshly decoded audio
+        while filled < window_samples:
+            if pending is None or not len(pending):
+                pending = None if eof else next(chunks, None)
+                if pending is None:
+                    eof = True
+                    state["audio_hash"] = digest.hexdigest() if digest else None
+                    state["audio_seconds"] = offset + filled / sr
+                    break
+                if digest: digest.update(pending)
+            take = min(len(pending), window_samples - filled)
+            buffer[filled:filled + take] = pending[:take]
+            pending = pending[take:]
+            filled += take
+
+        if filled == 0: break
+        last_window = eof and (pending is None or not len(pending))
+        job_checkpoint()
+
+        progress = state.get("progress")
+        if progress: progress.span(offset, filled / sr)
+
+        if vad:
+            result, stats = transcribe_with_vad(
+                buffer[:filled], lambda audio: model.transcribe(audio, **opts), sr
+            )
+            totals = state.setdefault("vad", {"totalSeconds": 0.0, "speechSeconds": 0.0, "skippedSeconds": 0.0, "regions": 0})
+            for k in totals: totals[k] += stats[k]
+        else:
+            result = model.transcribe(buffer[:filled], **opts)
+        segments = result.get("segments", [])
+        if "language" not in opts and result.get("language"):
+            opts["language"] = result["language"]
+        state["language"] = opts.get("language")
+        if progress: progress.fraction(1.0)
+
+        cut = filled
+        if not last_window and len(segments) > 1:
+            tail_start = int(segments[-1]["start"] * sr)
+            if min_advance <= tail_start < filled:
+                cut = tail_start
+                segments = segments[:-1]
+
+        for segment in segments:
+            yield _shift_segment(segment, offset, seg_id)
+            seg_id += 1
+
+        if segments:
+            opts["initial_prompt"] = "".join(s["text"] for s in segments)[-200:]
+
+        remaining = filled - cut
+        if remaining:
+            buffer[:remaining] = buffer[cut:filled]
+        filled = remaining
+        offset += cut / sr
+
+        on_window = state.get("on_window")
+        if on_window:
+            on_window({"offset": offset, "segId": seg_id,
+                       "prompt": opts.get("initial_prompt", ""), "language": opts.get("language")})
+
+def transcribe_streaming(model, path, opts, state=None, vad=False, live=None):
+    """
+    Streaming counterpart of model.transcribe(path): same result layout
+    ("text", "segments", "language"), but decoding and inference overlap and
+    peak memory stays at one window regardless of input length.
+    If given, `live` is called with the iterator of finalized segments and
+    must consume it (see write_live_output).
+    With a TranscriptCheckpoint in state["checkpoint"], a saved checkpoint is
+    resumed and progress is saved periodically while transcribing.
+    """
+    if state is None: state = {}
+    segments = []
+    checkpoint = state.get("checkpoint")
+    if checkpoint:
+        resume = checkpoint.load()
+        if resume:
+            state["resume"] = resume
+            segments.extend(resume["segments"])
+            m, s = divmod(int(resume["offset"]), 60)
+            send_to_electron("info", f"Resuming from checkpoint at {m:02}:{s:02}")
+            if state.get("progress"): state["progress"].advance(resume["offset"])
+        state["on_window"] = lambda position: checkpoint.update(segments, position)
+
+    def produced():
+        # Segments restored from a checkpoint come first (no inference needed)
+        yield from list(segments)
+        for segment in iter_streaming_segments(model, path, opts, state, vad):
+            segments.append(segment)
+            yield segment
+
+    if live is None:
+        for _ in produced(): pass
+    else:
+        live(produced())
+    return {
+        "text": "".join(s["text"] for s in segments),
+        "segments": segments,
+        "language": state.get("language"),
+    }
 
-        m, s = divmod(int(duration_sec), 60)
-        duration_str = f"{m:02}:{s:02}"
+# --- TRANSCRIPTION CACHE ---
+TRANSCRIPT_CACHE_MAX_MB = int(os.environ.get("V2S_TRANSCRIPT_CACHE_MB", "512"))
 
-        b64_thumb = None
+def app_cache_dir(*parts):
+    """
+    Per-user cache folder for the engine (created on demand).
+    Windows: %LOCALAPPDATA%/VideoToSRT/cache, elsewhere ~/.cache/videotosrt.
+    V2S_CACHE_DIR overrides the root.
+    """
+    root = os.environ.get("V2S_CACHE_DIR")
+    if not root:
+        if os.name == "nt" and os.environ.get("LOCALAPPDATA"):
+            root = os.path.join(os.environ["LOCALAPPDATA"], "VideoToSRT", "cache")
+        else:
+            root = os.path.join(os.path.expanduser("~"), ".cache", "videotosrt")
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
 
-        # 2. Generate Thumbnail only for video-like files
-        if ext not in audio_exts:
-            try:
-                timestamp = "00:00:01"
-                cmd_thumb = [
-                    FFMPEG_PATH, "-y", "-ss", timestamp, "-i", file_path,
-                    "-vframes", "1", "-f", "image2pipe", "-vcodec", "mjpeg", "-"
-                ]
-
-                thumb_data = subprocess.check_output(
-                    cmd_thumb,
-                    stderr=subprocess.DEVNULL,
-                    **kwargs
-                )
+def _write_json_atomic(path, obj):
+    """
+    Writes JSON next to `path` first and renames it into place, so readers
+    (including other worker processes) never see a half-written file.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, default=float)
+    os.replace(tmp_path, path)
 
-                b64_thumb = "data:image/jpeg;base64," + base64.b64encode(thumb_data).decode('utf-8')
-            except Exception:
-                # Thumbnail failure should not break duration display
-                b64_thumb = None
+def hash_audio(audio):
+    """
+    Content hash of decoded audio (float32 samples), independent of container,
+    file name or modification time.
+    """
+    import hashlib
+    return hashlib.sha256(np.ascontiguousarray(audio, dtype=np.float32)).hexdigest()
+
+def transcript_cache_key(audio_hash, model_name, language):
+    import hashlib
+    return hashlib.sha256(f"{audio_hash}|{model_name}|{language or 'auto'}".encode()).hexdigest()
+
+def _source_pointer_path(path, model_name, language):
+    """
+    Location of the small file that maps (path, mtime, size, model, language)
+    to a transcript cache key. This lets an unchanged file be re-exported
+    without decoding its audio again.
+    """
+    import hashlib
+    st = os.stat(path)
+    fingerprint = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{model_name}|{language or 'auto'}"
+    name = hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+    return os.path.join(app_cache_dir("transcripts", "sources"), f"{name}.key")
+
+def cache_lookup(key):
+    """
+    Returns the cached Whisper result for `key`, or None. A hit refreshes the
+    entry's mtime, which is what LRU eviction orders by.
+    """
+    entry = os.path.join(app_cache_dir("transcripts"), f"{key}.json")
+    try:
+        with open(entry, "r", encoding="utf-8") as f:
+            result = json.load(f)
+        os.utime(entry, None)
+        return result
+    except (OSError, ValueError):
+        return None
+
+def cache_lookup_source(path, model_name, language):
+    try:
+        with open(_source_pointer_path(path, model_name, language), "r", encoding="utf-8") as f:
+            key = f.read().strip()
+    except OSError:
+        return None
+    return cache_lookup(key) if key else None
 
-        send_to_electron("analysis-result", "Analyzed", {
-            "path": file_path,
-            "duration": duration_str,
-            "thumbnail": b64_thumb
+def cache_store(key, result, path=None, model_name=None, language=None):
+    """
+    Stores a Whisper result (segments + word timestamps) under `key`, records
+    the source-file pointer when `path` is given, then evicts old entries.
+    Cache failures never fail the job.
+    """
+    try:
+        cache_dir = app_cache_dir("transcripts")
+        _write_json_atomic(os.path.join(cache_dir, f"{key}.json"), {
+            "text": result.get("text", ""),
+            "segments": result.get("segments", []),
+            "language": result.get("language"),
         })
+        if path:
+            pointer = _source_pointer_path(path, model_name, language)
+            with open(pointer, "w", encoding="utf-8") as f:
+                f.write(key)
+        _evict_transcript_cache(cache_dir)
+    except OSError:
+        pass
+
+def _evict_transcript_cache(cache_dir, max_bytes=None):
+    """
+    Deletes least recently used entries until the cache fits in its size cap.
+    """
+    if max_bytes is None: max_bytes = TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024
+    _evict_lru(cache_dir, max_bytes, ".json")
+
+def _evict_lru(cache_dir, max_bytes, suffix):
+    """
+    Deletes the `suffix` files of `cache_dir` with the oldest mtime (cache hits
+    touch their files) until the rest fits in `max_bytes`.
+    """
+    entries = []
+    total = 0
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.endswith(suffix):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+    entries.sort()
+    for _, size, entry_path in entries:
+        if total <= max_bytes: break
+        try:
+            os.remove(entry_path)
+            total -= size
+        except OSError:
+            pass
+
+# --- RESUMABLE CHECKPOINTS (STREAMING MODE) ---
+CHECKPOINT_VERSION = 1
+CHECKPOINT_INTERVAL_SECONDS = 30  # wall-clock time between checkpoint writes
+CHECKPOINT_MAX_AGE_DAYS = 14      # abandoned checkpoints are deleted after this
+CONTENT_SAMPLE_BYTES = 1024 * 1024
+
+def quick_content_hash(file_path):
+    """
+    Content hash of a media file from its size and three 1 MB samples (start,
+    middle, end), so it does not depend on name or mtime and stays fast for
+    multi-GB files.
+    """
+    import hashlib
+    size = os.path.getsize(file_path)
+    digest = hashlib.sha256(str(size).encode("ascii"))
+    with open(file_path, "rb") as f:
+        for pos in (0, max(0, size // 2 - CONTENT_SAMPLE_BYTES // 2), max(0, size - CONTENT_SAMPLE_BYTES)):
+            f.seek(pos)
+            digest.update(f.read(CONTENT_SAMPLE_BYTES))
+    return digest.hexdigest()
+
+def checkpoint_key(file_path, model_name, language):
+    import hashlib
+    key = f"{quick_content_hash(file_path)}|{model_name}|{language or 'auto'}|{STREAM_WINDOW_SECONDS}|v{CHECKPOINT_VERSION}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+class TranscriptCheckpoint:
+    """
+    Completed segments plus the decoder position of a streaming job, saved
+    every CHECKPOINT_INTERVAL_SECONDS so a crashed or killed job can continue
+    from its last completed window.
+    """
+    def __init__(self, key):
+        self.path = os.path.join(app_cache_dir("checkpoints"), f"{key}.json")
+        self.last_write = time.monotonic()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != CHECKPOINT_VERSION: return None
+        return data
+
+    def update(self, segments, position):
+        if time.monotonic() - self.last_write < CHECKPOINT_INTERVAL_SECONDS: return
+        self.save(segments, position)
+
+    def save(self, segments, position):
+        try:
+            _write_json_atomic(self.path, dict(position, version=CHECKPOINT_VERSION, segments=segments))
+        except OSError:
+            return  # a missed checkpoint must not fail the job
+        self.last_write = time.monotonic()
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+def collect_stale_checkpoints(max_age_days=CHECKPOINT_MAX_AGE_DAYS):
+    """Deletes checkpoints of jobs that were never resumed."""
+    cutoff = time.time() - max_age_days * 86400
+    with os.scandir(app_cache_dir("checkpoints")) as it:
+        for entry in it:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+# --- ANALYSIS ENGINE ----
+ANALYSIS_WORKERS = min(4, os.cpu_count() or 1)
+MEDIA_CACHE_MAX_MB = int(os.environ.get("V2S_MEDIA_CACHE_MB", "16"))
+_analysis_pool = None
+_analysis_cache = {}  # fingerprint -> analysis-result data
+_analysis_cache_lock = threading.Lock()
+
+def _media_fingerprint(file_path):
+    import hashlib
+    st = os.stat(file_path)
+    key = f"{os.path.abspath(file_path)}|{st.st_mtime_ns}|{st.st_size}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+def probe_media(file_path):
+    """
+    Runs ffprobe once and returns duration, stream list and audio tracks.
+    """
+    cmd = [
+        FFPROBE_PATH, "-v", "error",
+        "-print_format", "json",
+        "-show_format", "-show_streams",
+        file_path
+    ]
+    info = json.loads(subprocess.check_output(cmd, **_subprocess_no_window_kwargs()).decode("utf-8", errors="ignore"))
+
+    streams = []
+    audio_tracks = []
+    has_video = False
+    durations = []
+    for s in info.get("streams", []):
+        kind = s.get("codec_type")
+        tags = s.get("tags", {}) or {}
+        entry = {"index": s.get("index"), "type": kind, "codec": s.get("codec_name")}
+        if s.get("duration"): durations.append(float(s["duration"]))
+
+        if kind == "video":
+            entry["width"] = s.get("width")
+            entry["height"] = s.get("height")
+            # Cover art in audio files shows up as a one-frame video stream
+            if not (s.get("disposition", {}) or {}).get("attached_pic"):
+                has_video = True
+        elif kind == "audio":
+            entry["channels"] = s.get("channels")
+            entry["sampleRate"] = int(s["sample_rate"]) if s.get("sample_rate") else None
+            entry["language"] = tags.get("language")
+            entry["title"] = tags.get("title")
+            audio_tracks.append(dict(entry, audioIndex=len(audio_tracks)))
+        streams.append(entry)
+
+    fmt = info.get("format", {}) or {}
+    duration_sec = float(fmt["duration"]) if fmt.get("duration") else max(durations, default=0.0)
+
+    return {
+        "durationSeconds": duration_sec,
+        "streams": streams,
+        "audioTracks": audio_tracks,
+        "hasVideo": has_video,
+        "format": fmt.get("format_name"),
+    }
+
+def _cached_analysis(fingerprint):
+    with _analysis_cache_lock:
+        data = _analysis_cache.get(fingerprint)
+    if data is not None:
+        return data
+
+    entry = os.path.join(app_cache_dir("media"), f"{fingerprint}.json")
+    try:
+        with open(entry, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        os.utime(entry, None)  # most recently used for _evict_lru
+    except (OSError, ValueError):
+        return None
+    with _analysis_cache_lock:
+        _analysis_cache[fingerprint] = data
+    return data
+
+def _store_analysis(fingerprint, data):
+    with _analysis_cache_lock:
+        _analysis_cache[fingerprint] = data
+    try:
+        cache_dir = app_cache_dir("media")
+        _write_json_atomic(os.path.join(cache_dir, f"{fingerprint}.json"), data)
+        _evict_lru(cache_dir, MEDIA_CACHE_MAX_MB * 1024 * 1024, ".json")
+    except OSError:
+        pass
+
+def _probe_and_store(file_path, fingerprint):
+    """probe_media() plus the display duration, stored in the analysis cache."""
+    media = probe_media(file_path)
+    m, s = divmod(int(media["durationSeconds"]), 60)
+    data = dict(media, duration=f"{m:02}:{s:02}")
+    _store_analysis(fingerprint, data)
+    return data
+
+def media_info(file_path):
+    """
+    probe_media() results (from the analysis cache when possible, else probed
+    once and cached for the next caller), or None.
+    """
+    try:
+        fingerprint = _media_fingerprint(file_path)
+        cached = _cached_analysis(fingerprint)
+        if cached is not None:
+            return cached
+        return _probe_and_store(file_path, fingerprint)
+    except Exception:
+        return None
+
+def media_duration(file_path):
+    """
+    Duration in seconds (from the analysis cache when possible), or None.
+    """
+    return (media_info(file_path) or {}).get("durationSeconds")
+
+def analyze_file(file_path, preview=False):
+    """
+    Sends the file's "analysis-result" (duration, streams, audio tracks). For
+    video, a "thumbnail" event follows later (see request_thumbnail).
+    """
+    if not file_path or not os.path.exists(file_path):
+        send_to_electron("error", "File analysis failed: Not found", {"path": file_path})
+        return
+
+    try:
+        # Unchanged file (same path, mtime and size): answer from the cache
+        fingerprint = _media_fingerprint(file_path)
+        data = _cached_analysis(fingerprint)
+        if data is not None:
+            # Entries from older versions carry an inline base64 thumbnail
+            data = {k: v for k, v in data.items() if k != "thumbnail"}
+        else:
+            # Duration, streams and audio tracks from a single ffprobe call
+            data = _probe_and_store(file_path, fingerprint)
+
+        send_to_electron("analysis-result", "Analyzed", dict(data, path=file_path))
+
+        # Thumbnail only for files with a real video stream, after the duration is out
+        if data.get("hasVideo"):
+            request_thumbnail(file_path, preview, data.get("durationSeconds"))
 
     except Exception as e:
-        send_to_electron("error", f"Analysis failed: {str(e)}")
+        send_to_electron("error", f"Analysis failed: {str(e)}", {"path": file_path})
+
+def analyze_files(paths, preview=False):
+    """
+    Analyzes files on a small bounded thread pool and returns immediately;
+    each file's "analysis-result" event is sent as soon as it is ready.
+    """
+    global _analysis_pool
+    from concurrent.futures import ThreadPoolExecutor
+    if _analysis_pool is None:
+        _analysis_pool = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="analyze")
+    return [_analysis_pool.submit(analyze_file, p, preview) for p in paths]
+
+# --- THUMBNAILS & PREVIEW STRIPS ---
+THUMB_WIDTH = 240           # queue cards are 100x56; leaves room for HiDPI screens
+PREVIEW_FRAMES = 6          # frames in a preview strip ("preview": true)
+PREVIEW_FRAME_WIDTH = 160
+THUMB_WORKERS = 2
+THUMB_CACHE_MAX_MB = int(os.environ.get("V2S_THUMB_CACHE_MB", "64"))
+_thumbnail_pool = None
+
+def _render_frames(file_path, out_path, times, width):
+    """
+    Grabs the frames at `times` (seconds) in one ffmpeg run, scales them to
+    `width` and writes them side by side as one JPEG. Every frame uses input
+    seeking, so nothing between the frames is decoded.
+    """
+    cmd = [FFMPEG_PATH, "-y", "-v", "error"]
+    for t in times:
+        cmd += ["-ss", f"{t:.3f}", "-i", file_path]
+    graph = "".join(f"[{i}:v:0]scale={width}:-2,setsar=1[f{i}];" for i in range(len(times)))
+    if len(times) > 1:
+        graph += "".join(f"[f{i}]" for i in range(len(times))) + f"hstack=inputs={len(times)}[out]"
+    else:
+        graph = graph.replace("[f0];", "[out]")
+
+    # Written under a temp name first: a concurrent reader never sees half a JPEG
+    tmp_path = f"{out_path[:-4]}.{os.getpid()}.{threading.get_ident()}.tmp.jpg"
+    cmd += ["-filter_complex", graph, "-map", "[out]", "-frames:v", "1", "-q:v", "5", "-update", "1", tmp_path]
+    try:
+        subprocess.check_call(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **_subprocess_no_window_kwargs())
+        os.replace(tmp_path, out_path)
+    finally:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+
+def make_thumbnail(file_path, preview=False, duration=None):
+    """
+    Returns {"thumbnailPath"[, "previewPath"]}: JPEGs in the thumbs cache,
+    rendered on first use. Names are keyed like the analysis cache (path,
+    mtime, size), so a changed file gets new images; the cache is capped at
+    THUMB_CACHE_MAX_MB, least recently used first.
+    """
+    fingerprint = _media_fingerprint(file_path)
+    cache_dir = app_cache_dir("thumbs")
+    if duration is None: duration = media_duration(file_path) or 0.0
+
+    # Same frame as before (00:00:01), unless the clip is shorter than that
+    wanted = {"thumbnailPath": (f"{fingerprint}_{THUMB_WIDTH}.jpg", [min(1.0, duration / 2)], THUMB_WIDTH)}
+    if preview:
+        times = [(i + 0.5) * duration / PREVIEW_FRAMES for i in range(PREVIEW_FRAMES)]
+        wanted["previewPath"] = (f"{fingerprint}_strip{PREVIEW_FRAMES}x{PREVIEW_FRAME_WIDTH}.jpg", times, PREVIEW_FRAME_WIDTH)
+
+    paths = {}
+    rendered = False
+    for key, (name, times, width) in wanted.items():
+        target = os.path.join(cache_dir, name)
+        if os.path.exists(target):
+            os.utime(target, None)
+        else:
+            _render_frames(file_path, target, times, width)
+            rendered = True
+        paths[key] = target
+
+    if rendered:
+        _evict_lru(cache_dir, THUMB_CACHE_MAX_MB * 1024 * 1024, ".jpg")
+    return paths
+
+def _send_thumbnail(file_path, preview, duration):
+    try:
+        paths = make_thumbnail(file_path, preview, duration)
+    except Exception:
+        # No thumbnail is not an error: the queue card keeps its placeholder
+        return
+    send_to_electron("thumbnail", "Thumbnail ready", dict(paths, path=file_path))
+
+def request_thumbnail(file_path, preview=False, duration=None):
+    """
+    Queues the thumbnail (and with `preview`, the preview strip) of a video on
+    its own small thread pool, so rendering frames never delays the probes.
+    A "thumbnail" event with the cached JPEG paths follows when they are ready.
+    """
+    global _thumbnail_pool
+    from concurrent.futures import ThreadPoolExecutor
+    if _thumbnail_pool is None:
+        _thumbnail_pool = ThreadPoolExecutor(max_workers=THUMB_WORKERS, thread_name_prefix="thumbs")
+    return _thumbnail_pool.submit(_send_thumbnail, file_path, preview, duration)
 
 # --- TEXT PROCESSING ---
+PROFANITY_WORDS = ["fuck", "shit", "bitch", "asshole", "cunt", "dick"]
+# One precompiled pattern for all words; each match is masked with as many '*'
+_PROFANITY_RE = re.compile("|".join(re.escape(w) for w in PROFANITY_WORDS), re.IGNORECASE)
+
+def _mask_match(m):
+    return "*" * len(m.group(0))
+
 def apply_profanity_filter(text):
-    bad_words = ["fuck", "shit", "bitch", "asshole", "cunt", "dick"]
-    for word in bad_words:
-        pattern = re.compile(re.escape(word), re.IGNORECASE)
-        text = pattern.sub("*" * len(word), text)
-    return text
-
-def generate_output(result, format_type, preset_mode, max_chars, max_lines, use_profanity):
-    all_words = []
-    for segment in result["segments"]:
-        if "words" in segment: all_words.extend(segment["words"])
-    
-    if not all_words: return "", 0
+    return _PROFANITY_RE.sub(_mask_match, text)
+
+def count_words(result):
+    return sum(len(segment["words"]) for segment in result["segments"] if "words" in segment)
+
+def iter_subtitle_blocks(words, preset_mode, max_chars, max_lines):
+    """
+    Groups word timings into subtitle blocks ({"start", "end", "text"}).
+    Blocks are yielded as soon as they are complete, so `words` can be any
+    iterable, including one that is still being produced.
+    """
+    if preset_mode == "tiktok":
+        for w in words:
+            yield {"start": w["start"], "end": w["end"], "text": w["word"].strip()}
+        return
+
+    current_block_lines = []
+    current_line_words = []
+    current_line_len = 0
+
+    def make_line():
+        s = current_line_words[0]["start"]; e = current_line_words[-1]["end"]
+        txt = "".join([w["word"] for w in current_line_words]).strip()
+        return {"text": txt, "start": s, "end": e}
+
+    def make_block():
+        s = current_block_lines[0]["start"]; e = current_block_lines[-1]["end"]
+        txt = "\n".join([l["text"] for l in current_block_lines])
+        return {"start": s, "end": e, "text": txt}
+
+    for w_obj in words:
+        word_len = len(w_obj["word"])
+        if current_line_len + word_len > max_chars and current_line_len > 0:
+            current_block_lines.append(make_line())
+            current_line_words = []; current_line_len = 0
+            if len(current_block_lines) >= max_lines:
+                yield make_block()
+                current_block_lines = []
+        current_line_words.append(w_obj); current_line_len += word_len
+
+    if current_line_words: current_block_lines.append(make_line())
+    if current_block_lines: yield make_block()
+
+# Duration-aware reflow (see reflow_blocks). "reflow": true uses these values,
+# a dict overrides single ones, e.g. {"maxCps": 20}.
+REFLOW_DEFAULTS = {
+    "maxCps": 17.0,       # characters per second a viewer can read
+    "minDuration": 1.0,   # seconds a cue stays on screen at least...
+    "maxDuration": 7.0,   # ...and at most
+    "minGap": 0.08,       # seconds between two cues (2 frames at 25 fps)
+    "pauseSplit": 1.0,    # a silence this long always ends the cue
+}
+REFLOW_MIN_FILL = 0.5  # a cue may end early at punctuation once it holds this share of what fits
+_SENTENCE_END = list(".?!…。？！")
+_CLAUSE_END = list(",;:，、；：")
+_CLOSING = "\"')]”’»"
+
+def reflow_settings(args):
+    """The reflow settings of a request, or None if "reflow" is not set."""
+    value = args.get("reflow")
+    if not value: return None
+    settings = dict(REFLOW_DEFAULTS)
+    if isinstance(value, dict):
+        settings.update({k: float(v) for k, v in value.items() if k in REFLOW_DEFAULTS})
+    return settings
+
+def _last_index(mask):
+    """For every position, the index of the last True at or before it (-1 if none)."""
+    return np.maximum.accumulate(np.where(mask, np.arange(len(mask)), -1))
+
+def _wrap_lines(words, max_chars):
+    """Breaks words into lines with the same greedy rule as iter_subtitle_blocks."""
+    lines = []
+    line = []
+    line_len = 0
+    for w in words:
+        word_len = len(w["word"])
+        if line_len + word_len > max_chars and line_len > 0:
+            lines.append("".join(line).strip())
+            line = []; line_len = 0
+        line.append(w["word"]); line_len += word_len
+    if line: lines.append("".join(line).strip())
+    return lines
+
+def plan_cues(words, starts, ends, max_chars, max_lines, settings):
+    """
+    Splits `words` into cues: a list of (first word, last word, text).
+
+    For every word, the furthest word a cue starting there may reach is found
+    at once with prefix sums and binary searches: within max_chars * max_lines
+    characters and maxDuration seconds, and not past a pause of pauseSplit.
+    When a limit rather than a pause ends a cue, the break moves back to the
+    last sentence end, else the last clause end, as long as the cue keeps
+    REFLOW_MIN_FILL of its characters. A cue too short to read that can't be
+    stretched (the next one starts too soon) is merged into the next one.
+    `ends` must be non-decreasing. Linear in the number of words.
+    """
+    n = len(words)
+    idx = np.arange(n)
+    cum = np.concatenate(([0], np.cumsum(np.fromiter((len(w["word"]) for w in words), dtype=np.int64, count=n))))
+    max_cue_chars = max_chars * max_lines
+    min_dur, max_dur = settings["minDuration"], settings["maxDuration"]
+
+    by_chars = np.searchsorted(cum, cum[:-1] + max_cue_chars, side="right") - 2
+    by_time = np.searchsorted(ends, starts + max_dur, side="right") - 1
+    pause = np.append(starts[1:] - ends[:-1] >= settings["pauseSplit"], True)
+    next_pause = np.minimum.accumulate(np.where(pause, idx, n)[::-1])[::-1]
+    far = np.maximum(np.minimum(np.minimum(by_chars, by_time), next_pause), idx)
+
+    tails = np.array([w["word"].rstrip().rstrip(_CLOSING)[-1:] for w in words])
+    last_sentence = _last_index(np.isin(tails, _SENTENCE_END))
+    last_clause = _last_index(np.isin(tails, _CLAUSE_END))
+
+    # The walk itself is one step per cue; plain lists index faster than arrays
+    far, pause, cum = far.tolist(), pause.tolist(), cum.tolist()
+    last_sentence, last_clause = last_sentence.tolist(), last_clause.tolist()
+    cues = []
+    i = 0
+    while i < n:
+        b = far[i]
+        if not pause[b]:
+            enough = cum[i] + REFLOW_MIN_FILL * (cum[b + 1] - cum[i])
+            for p in (last_sentence[b], last_clause[b]):
+                if p >= i and cum[p + 1] >= enough:
+                    b = p; break
+        lines = _wrap_lines(words[i:b + 1], max_chars)
+        while len(lines) > max_lines and b > i:
+            # Greedy wrapping needed an extra line: give up words until it fits
+            b -= 1
+            lines = _wrap_lines(words[i:b + 1], max_chars)
+        cues.append((i, b, "\n".join(lines)))
+        i = b + 1
+
+    starts, ends = starts.tolist(), ends.tolist()
+    merged = []
+    for i, j, text in cues:
+        if merged:
+            pi, pj, _ = merged[-1]
+            if (ends[pj] - starts[pi] < min_dur
+                    and starts[i] - settings["minGap"] - starts[pi] < min_dur
+                    and starts[i] - ends[pj] < settings["pauseSplit"]
+                    and cum[j + 1] - cum[pi] <= max_cue_chars
+                    and ends[j] - starts[pi] <= max_dur):
+                lines = _wrap_lines(words[pi:j + 1], max_chars)
+                if len(lines) <= max_lines:
+                    merged[-1] = (pi, j, "\n".join(lines)); continue
+        merged.append((i, j, text))
+    return merged
+
+def reflow_blocks(words, preset_mode, max_chars, max_lines, settings):
+    """
+    Duration-aware counterpart of iter_subtitle_blocks for requests with
+    "reflow" (see reflow_settings). Cues come from plan_cues ("tiktok" keeps
+    one word per cue); then all cue times are fixed in one vectorized pass:
+    each cue stays up for minDuration and for as long as its text takes to
+    read at maxCps, never longer than maxDuration, and ends minGap before the
+    next cue starts. Needs the whole word list, so it can't run live.
+    """
+    words = list(words)
+    if not words: return
+    n = len(words)
+    starts = np.fromiter((w["start"] for w in words), dtype=np.float64, count=n)
+    ends = np.maximum.accumulate(np.fromiter((w["end"] for w in words), dtype=np.float64, count=n))
+
+    if preset_mode == "tiktok":
+        cues = [(k, k, w["word"].strip()) for k, w in enumerate(words)]
+    else:
+        cues = plan_cues(words, starts, ends, max_chars, max_lines, settings)
+
+    m = len(cues)
+    first = np.fromiter((c[0] for c in cues), dtype=np.int64, count=m)
+    last = np.fromiter((c[1] for c in cues), dtype=np.int64, count=m)
+    chars = np.fromiter((len(c[2]) - c[2].count("\n") for c in cues), dtype=np.float64, count=m)
+
+    cue_start = starts[first]
+    needed = np.minimum(np.maximum(settings["minDuration"], chars / settings["maxCps"]), settings["maxDuration"])
+    next_start = np.append(cue_start[1:], np.inf)
+    cue_end = np.maximum(ends[last], cue_start + needed)
+    cue_end = np.minimum(cue_end, np.minimum(next_start - settings["minGap"], cue_start + settings["maxDuration"]))
+    cue_end = np.maximum(cue_end, cue_start + 0.001)  # never zero length, even for overlapping words
+
+    for (_, _, text), s, e in zip(cues, cue_start.round(3).tolist(), cue_end.round(3).tolist()):
+        yield {"start": s, "end": e, "text": text}
+
+def iter_output(result, format_type, preset_mode, max_chars, max_lines, use_profanity, reflow=None):
+    """
+    Yields the output document (SRT/VTT/TXT) piece by piece. Every piece is
+    built once and never re-concatenated, so total work is linear in the
+    transcript length. With `reflow` settings, SRT/VTT cues come from
+    reflow_blocks.
+    """
+    segments = result["segments"]
+    if not count_words(result): return
 
     # --- SPECIAL PATH FOR TXT TRANSCRIPTS (Smart Paragraphs) ---
     if format_type == "txt":
-        output_str = ""
-        segments = result["segments"]
+        last = len(segments) - 1
         for i, segment in enumerate(segments):
             text = segment["text"].strip()
             if use_profanity: text = apply_profanity_filter(text)
-            
-            output_str += text
-            
-            # Check gap to next segment
-            if i < len(segments) - 1:
-                gap = segments[i+1]["start"] - segment["end"]
+
+            if i < last:
                 # If silence > 1.0s, new paragraph. Else, just space.
-                if gap > 1.0:
-                    output_str += "\n\n"
-                else:
-                    output_str += " "
-        
-        return output_str, len(all_words)
+                gap = segments[i+1]["start"] - segment["end"]
+                yield text + ("\n\n" if gap > 1.0 else " ")
+            else:
+                yield text
+        return
 
     # --- SUBTITLE FORMATTING LOGIC (SRT/VTT) ---
-    final_blocks = [] 
+    if format_type == "vtt": yield "WEBVTT\n\n"
 
-    if preset_mode == "tiktok":
-        for w in all_words:
-            final_blocks.append({ "start": w["start"], "end": w["end"], "text": w["word"].strip() })
+    all_words = (w for segment in segments if "words" in segment for w in segment["words"])
+    if reflow:
+        blocks = reflow_blocks(all_words, preset_mode, max_chars, max_lines, reflow)
     else:
-        current_block_lines = []
-        current_line_words = []
-        current_line_len = 0
-        
-        def flush_line():
-            nonlocal current_line_len, current_line_words
-            if current_line_words:
-                s = current_line_words[0]["start"]; e = current_line_words[-1]["end"]
-                txt = "".join([w["word"] for w in current_line_words]).strip()
-                current_block_lines.append({"text": txt, "start": s, "end": e})
-                current_line_words.clear(); current_line_len = 0
-        
-        def flush_block():
-            if current_block_lines:
-                s = current_block_lines[0]["start"]; e = current_block_lines[-1]["end"]
-                txt = "\n".join([l["text"] for l in current_block_lines])
-                final_blocks.append({"start": s, "end": e, "text": txt})
-                current_block_lines.clear()
-        
-        for w_obj in all_words:
-            word_len = len(w_obj["word"])
-            if current_line_len + word_len > max_chars and current_line_len > 0:
-                flush_line()
-                if len(current_block_lines) >= max_lines: flush_block()
-            current_line_words.append(w_obj); current_line_len += word_len
-        
-        flush_line(); flush_block()
-
-    output_str = ""
-    if format_type == "vtt": output_str += "WEBVTT\n\n"
-    
-    counter = 1
-    for b in final_blocks:
-        text = b["text"]
-        if use_profanity: text = apply_profanity_filter(text)
-        
-        s_ts = format_timestamp(b["start"], format_type)
-        e_ts = format_timestamp(b["end"], format_type)
-        sep = " --> " if format_type == "srt" else " --> " 
-        output_str += f"{counter}\n{s_ts}{sep}{e_ts}\n{text}\n\n"; counter += 1
-            
-    return output_str, len(all_words)
+        blocks = iter_subtitle_blocks(all_words, preset_mode, max_chars, max_lines)
+    for counter, b in enumerate(blocks, 1):
+        yield format_block(counter, b, format_type, use_profanity)[0]
+
+def format_block(counter, block, format_type, use_profanity):
+    """Returns (SRT/VTT cue text, displayed text) for one subtitle block."""
+    text = block["text"]
+    if use_profanity: text = apply_profanity_filter(text)
+
+    s_ts = format_timestamp(block["start"], format_type)
+    e_ts = format_timestamp(block["end"], format_type)
+    return f"{counter}\n{s_ts} --> {e_ts}\n{text}\n\n", text
+
+def generate_output(result, format_type, preset_mode, max_chars, max_lines, use_profanity, reflow=None):
+    content = "".join(iter_output(result, format_type, preset_mode, max_chars, max_lines, use_profanity, reflow))
+    return content, count_words(result)
+
+def write_output(save_path, result, format_type, preset_mode, max_chars, max_lines, use_profanity, timings=None,
+                 reflow=None):
+    """
+    Streams the formatted output straight into `save_path` without building
+    the whole document in memory. Returns the word count.
+    If a `timings` dict is given, time spent formatting and writing is added
+    to its "formatting" and "write" entries.
+    """
+    pieces = iter_output(result, format_type, preset_mode, max_chars, max_lines, use_profanity, reflow)
+    fmt_time = write_time = 0.0
+    t_open = time.perf_counter()
+    with open(save_path, "w", encoding="utf-8") as f:
+        write_time += time.perf_counter() - t_open
+        while True:
+            t0 = time.perf_counter()
+            batch = list(itertools.islice(pieces, 512))
+            t1 = time.perf_counter()
+            fmt_time += t1 - t0
+            if not batch: break
+            f.writelines(batch)
+            write_time += time.perf_counter() - t1
+        t_close = time.perf_counter()
+    write_time += time.perf_counter() - t_close
+
+    if timings is not None:
+        timings["formatting"] = timings.get("formatting", 0.0) + fmt_time
+        timings["write"] = timings.get("write", 0.0) + write_time
+    return count_words(result)
+
+def write_live_output(save_path, segments, format_type, preset_mode, max_chars, max_lines, use_profanity):
+    """
+    Groups the words of `segments` (an iterator that is still being produced)
+    into blocks with the same logic as iter_output, appends each block to
+    `save_path` as soon as it is complete and sends it as a "subtitle-block"
+    event. The file is flushed after every block, so a crash keeps everything
+    written so far. Returns the number of blocks.
+    """
+    words = (w for segment in segments for w in segment.get("words", []))
+    counter = 0
+    with open(save_path, "w", encoding="utf-8") as f:
+        for counter, b in enumerate(iter_subtitle_blocks(words, preset_mode, max_chars, max_lines), 1):
+            piece, text = format_block(counter, b, format_type, use_profanity)
+            if counter == 1 and format_type == "vtt": piece = "WEBVTT\n\n" + piece
+            f.write(piece)
+            f.flush()
+            send_to_electron("subtitle-block", "Subtitle block", {
+                "savePath": save_path,
+                "index": counter,
+                "start": b["start"],
+                "end": b["end"],
+                "text": text
+            })
+    return counter
+
+SIDECAR_VERSION = 1
+
+def _as_list(value, default):
+    if not value: return [default]
+    return [value] if isinstance(value, str) else list(value)
+
+def plan_outputs(path, args):
+    """
+    Returns the (save_path, format, preset) outputs requested by `args`.
+    "formats"/"presets" may list several values; every format is rendered with
+    every preset ("txt" ignores presets, so it is written once). A request for a
+    single output keeps the original file name. One track of a multi-track
+    file ("audioTrack") adds its "trackLabel" (see track_label) to every name.
+    """
+    formats = list(dict.fromkeys(_as_list(args.get("formats"), args.get("format", "srt"))))
+    presets = list(dict.fromkeys(_as_list(args.get("presets"), args.get("preset", "standard"))))
+
+    base_name = os.path.splitext(os.path.basename(path))[0]  # filename without extension
+    src_ext = os.path.splitext(os.path.basename(path))[1].lstrip(".").lower()
+    suffix = args.get("outputName", "subs")
+    safe_suffix = "".join([c for c in suffix if c.isalnum() or c in "_-"])
+
+    # Include original extension to avoid collisions (e.g., video.mp4 vs video.wav)
+    if src_ext:
+        file_stem = f"{base_name}_{src_ext}"
+    else:
+        file_stem = base_name
+    if args.get("audioTrack") is not None:
+        label = args.get("trackLabel") or track_label(args["audioTrack"])
+        file_stem += "_" + "".join([c for c in label if c.isalnum() or c in "_-"])
+
+    # Determine Folder
+    out_dir = args.get("outputDir", "")
+    if not out_dir or not os.path.exists(out_dir):
+        out_dir = os.path.dirname(path)  # Default to source folder
+
+    outputs = []
+    for ext in formats:
+        for preset in (presets[:1] if ext == "txt" else presets):
+            # Several presets of one format need distinct names
+            tag = f"_{preset}" if len(presets) > 1 and ext != "txt" else ""
+            outputs.append((os.path.join(out_dir, f"{file_stem}_{safe_suffix}{tag}.{ext}"), ext, preset))
+    sidecar_path = os.path.join(out_dir, f"{file_stem}_{safe_suffix}.json")
+    return outputs, sidecar_path
+
+def write_sidecar(sidecar_path, result):
+    """
+    Saves the raw segments and word timestamps, so the transcript can be
+    rendered again (other formats, presets, line lengths) without inference.
+    """
+    segments = [{
+        "start": s["start"], "end": s["end"], "text": s["text"],
+        "avg_logprob": s.get("avg_logprob"),
+        "words": [
+            {"word": w["word"], "start": w["start"], "end": w["end"], "probability": w.get("probability")}
+            for w in s.get("words", [])
+        ],
+    } for s in result["segments"]]
+    _write_json_atomic(sidecar_path, {
+        "version": SIDECAR_VERSION,
+        "language": result.get("language"),
+        "text": result.get("text", ""),
+        "segments": segments,
+    })
+
+def export_outputs(result, path, args, timings=None, written=()):
+    """
+    Writes every output requested by `args` (see plan_outputs) from the same
+    in-memory result, concurrently, plus the JSON sidecar if "sidecar" is set.
+    Paths in `written` (e.g. a live output) are already complete and skipped,
+    unless the request asks for reflow: live blocks can't be reflowed, so those
+    files are rewritten.
+    Returns (save_paths, word_count).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    all_outputs, sidecar_path = plan_outputs(path, args)
+    reflow = reflow_settings(args)
+    outputs = [o for o in all_outputs if reflow or o[0] not in written]
+    max_chars = args.get("maxChars", 42)
+    max_lines = args.get("maxLines", 2)
+    use_profanity = args.get("profanity", False)
+
+    # One timings dict per writer; merged once they are all done
+    per_output = [{} for _ in outputs]
+    with ThreadPoolExecutor(max_workers=max(1, len(outputs) + 1), thread_name_prefix="export") as pool:
+        futures = [
+            pool.submit(write_output, save_path, result, ext, preset, max_chars, max_lines, use_profanity, t, reflow)
+            for (save_path, ext, preset), t in zip(outputs, per_output)
+        ]
+        if args.get("sidecar"):
+            futures.append(pool.submit(write_sidecar, sidecar_path, result))
+        for future in futures:
+            future.result()  # re-raises the first write error
+
+    if timings is not None:
+        for t in per_output:
+            for stage, seconds in t.items():
+                timings[stage] = timings.get(stage, 0.0) + seconds
+    save_paths = [save_path for save_path, _, _ in all_outputs]
+    if args.get("sidecar"): save_paths.append(sidecar_path)
+    return save_paths, count_words(result)
+
+def render_sidecar(args):
+    """Re-renders outputs from a JSON sidecar written by an earlier transcription."""
+    sidecar_path = args.get("sidecarPath", "")
+    try:
+        with open(sidecar_path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+        if result.get("version") != SIDECAR_VERSION:
+            send_to_electron("error", "Unsupported sidecar version", {"sidecarPath": sidecar_path}); return
+        # Name outputs after the media file if it is given, else after the sidecar
+        source = args.get("path") or sidecar_path
+        opts = dict(args, sidecar=False)
+        if not args.get("outputDir"): opts["outputDir"] = os.path.dirname(sidecar_path)
+        save_paths, word_count = export_outputs(result, source, opts)
+        send_to_electron("success", "Done!", {
+            "path": source,
+            "sidecarPath": sidecar_path,
+            "savePath": save_paths[0],
+            "savePaths": save_paths,
+            "wordCount": word_count,
+        })
+    except Exception as e:
+        send_to_electron("error", str(e), {"sidecarPath": sidecar_path})
+
+RENDER_WORKERS = 2
+_render_pool = None
+
+def request_render(args):
+    """Queues a render_sidecar call on its own small thread pool, like analyze_files."""
+    global _render_pool
+    from concurrent.futures import ThreadPoolExecutor
+    if _render_pool is None:
+        _render_pool = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="render")
+    return _render_pool.submit(render_sidecar, args)
+
+# --- PROGRESS & METRICS ---
+PROGRESS_START = 10   # "Transcribing..." (what the UI showed before)
+PROGRESS_END = 90     # "Formatting..."
+
+class _TranscribeProgressBar:
+    """
+    Stand-in for the tqdm bar that whisper.transcribe() draws on stderr.
+    Whisper calls update() once per decoded 30s window with the number of mel
+    frames consumed; we forward the completed fraction to this thread's
+    progress listener. Every update is also a point where the job can be
+    paused or cancelled.
+    """
+    def __init__(self, total=None, **kwargs):
+        self.total = total or 0
+        self.n = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def update(self, n=1):
+        job_checkpoint()
+        self.n += n
+        listener = getattr(_job_local, "progress_listener", None)
+        if listener is not None and self.total:
+            listener(min(1.0, self.n / self.total))
+
+class ProgressReporter:
+    """
+    Turns "seconds of audio processed" into the 10..90% progress events the
+    UI already understands. Work is announced as spans of the timeline
+    (the whole file, a streaming window, a chunk); Whisper's per-window
+    callbacks are fractions of the current span. Events are only sent when the
+    integer percentage changes and never go backwards.
+    """
+    def __init__(self, total_seconds=None):
+        self.total = total_seconds if total_seconds and total_seconds > 0 else None
+        self.span_start = 0.0
+        self.span_length = 0.0
+        self.done = 0.0
+        self.windows = 0
+        self.last_pct = None
+
+    def span(self, start, length):
+        self.span_start = start
+        self.span_length = length
+        _job_local.progress_listener = self.fraction
+
+    def fraction(self, f):
+        self.windows += 1
+        self.advance(self.span_start + f * self.span_length)
+
+    def advance(self, seconds):
+        self.done = max(self.done, seconds)
+        if self.total:
+            pct = PROGRESS_START + int((PROGRESS_END - PROGRESS_START) * min(1.0, self.done / self.total))
+        else:
+            pct = PROGRESS_START
+        if pct == self.last_pct and self.total: return
+        self.last_pct = pct
+
+        m, s = divmod(int(self.done), 60)
+        message = f"Transcribing... {m:02}:{s:02}"
+        if self.total:
+            tm, ts = divmod(int(self.total), 60)
+            message += f" / {tm:02}:{ts:02}"
+        send_to_electron("progress", message, pct, stage="inference", windows=self.windows,
+                         processedSeconds=round(self.done, 1), totalSeconds=self.total)
+
+    def close(self):
+        if getattr(_job_local, "progress_listener", None) == self.fraction:
+            _job_local.progress_listener = None
+
+class JobMetrics:
+    """
+    Wall time per pipeline stage of one job (extraction, load, inference,
+    formatting, write), summarized into a record with real-time factor.
+    """
+    STAGES = ("extraction", "load", "inference", "formatting", "write")
+
+    def __init__(self, path, model_alias):
+        self.path = path
+        self.model_alias = model_alias
+        self.stages = dict.fromkeys(self.STAGES, 0.0)
+        self.started = time.perf_counter()
+
+    def timer(self, stage):
+        metrics = self
+
+        class _Timer:
+            def __enter__(self):
+                self.t0 = time.perf_counter()
+            def __exit__(self, *exc):
+                metrics.stages[stage] += time.perf_counter() - self.t0
+                return False
+        return _Timer()
+
+    def record(self, audio_seconds=None, device=None, **extra):
+        total = time.perf_counter() - self.started
+        inference = self.stages["inference"]
+        rec = {
+            "path": self.path,
+            "model": self.model_alias,
+            "device": device,
+            "audioSeconds": round(audio_seconds, 2) if audio_seconds else None,
+            "stages": {k: round(v, 3) for k, v in self.stages.items()},
+            "totalSeconds": round(total, 3),
+            # < 1.0 means faster than real time
+            "rtf": round(inference / audio_seconds, 4) if audio_seconds and inference else None,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        rec.update(extra)
+        return rec
+
+def emit_metrics(record, metrics_file=None):
+    """
+    Sends a job's timing record over the protocol and, if configured
+    ("metricsFile" or V2S_METRICS_FILE), appends it to a JSONL file.
+    """
+    send_to_electron("metrics", "Job timings", record)
+    metrics_file = metrics_file or os.environ.get("V2S_METRICS_FILE")
+    if not metrics_file: return
+    try:
+        with _stdout_lock:
+            with open(metrics_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+    except OSError:
+        pass
 
 # --- PROCESSOR ---
-def process_file(args):
+def job_cache_name(args, engine=DEFAULT_ENGINE):
+    """Cache entry name of a transcription: the model plus every option that changes its result."""
+    name = MODEL_MAP.get(args.get("model", "standard"), "base")
+    if engine != DEFAULT_ENGINE: name += f"+{engine}"
+    if args.get("vad"): name += "+vad"
+    if args.get("audioTrack") is not None: name += f"+a{int(args['audioTrack'])}"
+    return name
+
+@models_held()
+def process_file(args, transcript=None):
+    """
+    Transcribes one file and writes its outputs. A `transcript` dict
+    ("result", "audioHash", "audioSeconds", "inferenceSeconds") from batched
+    decoding (see process_short_clips) replaces the transcription step.
+    "audioTracks" (several audio streams) is handed to process_tracks.
+    """
     path = args.get("path")
     if not os.path.exists(path):
-        send_to_electron("error", "File not found"); return
+        send_to_electron("error", "File not found", {"path": path}); return
+    if args.get("audioTracks"):
+        return process_tracks(args)
 
-    model = load_ai_model(args.get("model", "standard"), args.get("device", "auto"))
-    if not model: return
-
-    send_to_electron("progress", "Transcribing...", 10)
-
-    # 1. EXTRACT AUDIO SILENTLY (Prevents Flashing)
-    temp_audio_path = extract_audio_silent(path)
-    if not temp_audio_path:
-        # Fallback: let Whisper (via our custom loader) handle original file
-        temp_audio_path = path
+    model_alias = args.get("model", "standard")
+    device_pref = args.get("device", "auto")
+    engine = args.get("engine", DEFAULT_ENGINE)
+    configure_model_pool(args)
 
     opts = {"word_timestamps": True, "verbose": False}
     if args.get("language") and args.get("language") != "auto":
         opts["language"] = args.get("language")
-    
 
-    try:
-        # 2. TRANSCRIBE (Use temp audio path; our custom loader handles WAV vs other formats)
-        result = model.transcribe(temp_audio_path, **opts)
+    # Live: blocks are written and sent while transcribing (needs streaming)
+    live = bool(args.get("live", False))
+    # Resumable: checkpoints of the streaming windows survive a crash
+    resumable = bool(args.get("resumable", False))
+    streaming = bool(args.get("streaming", False)) or live or resumable
+    use_vad = bool(args.get("vad", False))
+    use_cache = args.get("cache", True) is not False
+    real_name = MODEL_MAP.get(model_alias, "base")
+    language = opts.get("language")
+    # Other engines change the result, so they get their own cache entries
+    if engine != DEFAULT_ENGINE:
+        engine = resolve_engine(engine, get_device(device_pref))
+    cache_name = job_cache_name(args, engine)
+    # One track of a multi-track file; process_tracks may have extracted it already
+    track = args.get("audioTrack")
+    audio_file = args.get("audioFile")
+    temp_audio_path = path
+    audio_hash = None
+    audio_seconds = None
+    device = None
+    cached = False
+    written = ()
+    checkpoint = None
+
+    # CPU thread layout is process-wide
+    if args.get("cpuThreads") or args.get("interopThreads"):
+        configure_cpu_threads(args.get("cpuThreads"), args.get("interopThreads"))
+
+    metrics = JobMetrics(path, model_alias)
+    progress = None
 
-        # Cleanup extracted temp audio (but never delete the original input)
-        if temp_audio_path != path and os.path.exists(temp_audio_path):
-            os.remove(temp_audio_path)
+    try:
+        # 0. CACHE: same file, model and language already transcribed?
+        result = cache_lookup_source(path, cache_name, language) if use_cache and transcript is None else None
+        if result is not None:
+            cached = True
+            send_to_electron("info", "Using cached transcription")
+
+        elif transcript is not None:
+            result = transcript["result"]
+            audio_hash = transcript.get("audioHash")
+            audio_seconds = transcript.get("audioSeconds")
+            device = loaded_device
+            metrics.stages["inference"] = transcript.get("inferenceSeconds", 0.0)
+
+        elif streaming:
+            with metrics.timer("load"):
+                model = load_ai_model(model_alias, device_pref, engine=engine, hold=True)
+            if not model: raise RuntimeError(getattr(_job_local, "load_error", "Failed to load model"))
+            preload_next_model(args)
+            device = loaded_device
+            send_to_electron("progress", "Transcribing...", PROGRESS_START)
+
+            # ffmpeg stdout -> 30s windows -> Whisper, no temp WAV on disk.
+            # Decoding overlaps inference here, so it all counts as inference.
+            progress = ProgressReporter(media_duration(path))
+            if resumable:
+                collect_stale_checkpoints()
+                checkpoint = TranscriptCheckpoint(checkpoint_key(path, cache_name, language))
+            state = {"progress": progress, "checkpoint": checkpoint, "track": None if audio_file else track}
+            live_writer = None
+            live_outputs = [o for o in plan_outputs(path, args)[0] if o[1] in ("srt", "vtt")] if live else []
+            if live_outputs:
+                live_path, live_format, live_preset = live_outputs[0]
+                written = (live_path,)
+                live_writer = lambda segments: write_live_output(
+                    live_path, segments, live_format, live_preset,
+                    args.get("maxChars", 42), args.get("maxLines", 2), args.get("profanity", False)
+                )
+            with metrics.timer("inference"):
+                result = transcribe_streaming(model, audio_file or path, opts, state, use_vad, live_writer)
+            audio_hash = state.get("audio_hash")
+            audio_seconds = state.get("audio_seconds")
+            if use_vad and state.get("vad"):  # absent when no window was decoded
+                report_vad_stats({k: round(v, 2) for k, v in state["vad"].items()})
 
-        send_to_electron("progress", "Formatting...", 90)
+        else:
+            # 1. EXTRACT AUDIO SILENTLY (Prevents Flashing)
+            with metrics.timer("extraction"):
+                temp_audio_path = audio_file or extract_audio_silent(path, track)
+                if not temp_audio_path:
+                    # Fallback: let our custom loader decode the original file
+                    temp_audio_path = path
+                audio = custom_load_audio(temp_audio_path, track=track if temp_audio_path == path else None)
+                audio_seconds = len(audio) / SAMPLE_RATE
+
+                # Same audio content under another name/container?
+                audio_hash = hash_audio(audio)
+            job_checkpoint()
+            if use_cache:
+                result = cache_lookup(transcript_cache_key(audio_hash, cache_name, language))
+                if result is not None:
+                    cached = True
+                    send_to_electron("info", "Using cached transcription")
+
+            if result is None:
+                with metrics.timer("load"):
+                    model = load_ai_model(model_alias, device_pref, engine=engine, hold=True)
+                if not model: raise RuntimeError(getattr(_job_local, "load_error", "Failed to load model"))
+                preload_next_model(args)
+                device = loaded_device
+                send_to_electron("progress", "Transcribing...", PROGRESS_START)
+
+                progress = ProgressReporter(audio_seconds)
+                progress.span(0.0, audio_seconds)
+
+                # 2. TRANSCRIBE
+                def run_model(samples):
+                    if args.get("chunked"):
+                        # Long file: split at silences and transcribe chunks in parallel
+                        return transcribe_chunked(
+                            model, samples, opts, model_alias, device_pref, args.get("workers"), progress,
+                            engine=engine
+                        )
+                    return model.transcribe(samples, **opts)
+
+                with metrics.timer("inference"):
+                    if use_vad:
+                        # Only speech goes to Whisper; timestamps are mapped back
+                        result, vad_stats = transcribe_with_vad(audio, run_model)
+                        report_vad_stats(vad_stats)
+                    else:
+                        result = run_model(audio)
+            del audio
+
+        if use_cache and audio_hash:
+            cache_store(
+                transcript_cache_key(audio_hash, cache_name, language),
+                result, path, cache_name, language
+            )
+
+        job_checkpoint()
+        send_to_electron("progress", "Formatting...", PROGRESS_END, stage="formatting")
 
         # Confidence
         avg_logprob = sum([s["avg_logprob"] for s in result["segments"]]) / len(result["segments"]) if result["segments"] else -1
         confidence = round(100 * (2.718 ** avg_logprob))
 
-        content, word_count = generate_output(
-            result, 
-            args.get("format", "srt"),
-            args.get("preset", "standard"),
-            args.get("maxChars", 42),
-            args.get("maxLines", 2),
-            args.get("profanity", False)
-        )
+        # Every requested format/preset is rendered from this one result
+        save_paths, word_count = export_outputs(result, path, args, timings=metrics.stages, written=written)
+        save_path = save_paths[0]
 
-        # Save Logic
-        base_name = os.path.splitext(os.path.basename(path))[0]  # filename without extension
-        src_ext = os.path.splitext(os.path.basename(path))[1].lstrip(".").lower()
-        ext = args.get("format", "srt")
-        suffix = args.get("outputName", "subs")
-        safe_suffix = "".join([c for c in suffix if c.isalnum() or c in "_-"])
+        # Done: the checkpoint is no longer needed
+        if checkpoint: checkpoint.clear()
 
-        # Include original extension to avoid collisions (e.g., video.mp4 vs video.wav)
-        if src_ext:
-            file_stem = f"{base_name}_{src_ext}"
-        else:
-            file_stem = base_name
-        
-        # Determine Folder
-        out_dir = args.get("outputDir", "")
-        if not out_dir or not os.path.exists(out_dir):
-            out_dir = os.path.dirname(path)  # Default to source folder
-            
-        save_path = os.path.join(out_dir, f"{file_stem}_{safe_suffix}.{ext}")
-        
-        with open(save_path, "w", encoding="utf-8") as f:
-            f.write(content)
+        emit_metrics(metrics.record(
+            audio_seconds, device,
+            cached=cached,
+            mode="batched" if transcript is not None else (
+                ("live" if written else "streaming") if streaming else ("chunked" if args.get("chunked") else "standard")
+            ),
+            engine=engine,
+            vad=use_vad,
+            words=word_count
+        ), args.get("metricsFile"))
 
         send_to_electron("success", f"Done!", {
             "path": path,
             "savePath": save_path,
+            "savePaths": save_paths,
             "wordCount": word_count,
             "confidence": confidence
         })
 
+    except JobCancelled:
+        send_to_electron("cancelled", "Cancelled", {"path": path})
+
     except Exception as e:
-        send_to_electron("error", str(e))
+        send_to_electron("error", str(e), {"path": path})
 
-def main():
-    send_to_electron("status", "Engine Ready")
-    send_to_electron("info", f"System: {get_device().upper()} Acceleration Detected")
+    finally:
+        if progress: progress.close()
+        # Cleanup extracted temp audio (but never delete the original input)
+        if temp_audio_path != path and os.path.exists(temp_audio_path):
+            os.remove(temp_audio_path)
+
+# --- BATCH SCHEDULER ---
+def _available_memory_mb(device="cpu"):
+    """
+    Free memory on the target device in MB, or None if it can't be determined.
+    """
+    if device == "cuda":
+        try:
+            free_bytes, _ = torch.cuda.mem_get_info()
+            return free_bytes // (1024 * 1024)
+        except Exception:
+            return None
+
+    if os.name == "nt":
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [
+                ("dwLength", ctypes.c_ulong),
+                ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong),
+                ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong),
+                ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong),
+                ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+            ]
+
+        stat = MEMORYSTATUSEX()
+        stat.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(stat)):
+            return stat.ullAvailPhys // (1024 * 1024)
+        return None
+
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def plan_worker_count(model_alias, device_pref="auto", requested=None):
+    """
+    Number of worker processes to run for a batch: the requested count, capped
+    by CPU cores and by how many copies of the model fit in free memory.
+    """
+    cpu_count = os.cpu_count() or 1
+    workers = int(requested) if requested else max(1, cpu_count // 2)
+    workers = max(1, min(workers, cpu_count))
+
+    real_name = MODEL_MAP.get(model_alias, "base")
+    per_model = MODEL_RAM_MB.get(real_name, MODEL_RAM_MB["base"])
+    free_mb = _available_memory_mb(get_device(device_pref))
+    if free_mb is not None:
+        workers = max(1, min(workers, free_mb // per_model))
+    return workers
+
+def _relay_event(payload, outcomes):
+    """
+    Prints an event on behalf of a batch job and records per-file success/error.
+    """
+    if payload.get("path") and payload["type"] in ("success", "error", "cancelled"):
+        outcomes[payload["path"]] = payload["type"]
+    _emit(payload)
+
+def _forward_events(event_queue, relay, timeout=0.0):
+    """
+    Hands everything currently queued by the worker processes to `relay`.
+    """
+    import queue
+    while True:
+        try:
+            payload = event_queue.get(timeout=timeout)
+        except queue.Empty:
+            return
+        timeout = 0.0
+        relay(payload)
+
+def _job_tag(job):
+    # Routing fields of a job's events: its file (and audio track)
+    tag = {"path": job["path"]}
+    if job.get("audioTrack") is not None: tag["audioTrack"] = job["audioTrack"]
+    return tag
+
+def _cancel_jobs(jobs, relay):
+    for job in jobs:
+        relay(dict({"type": "cancelled", "message": "Cancelled"}, **_job_tag(job)))
+
+def _batch_worker_init(event_queue, model_alias, device_pref, threads, control=None, engine=DEFAULT_ENGINE):
+    """
+    Runs once in each worker process: route events to the parent, split the
+    CPU cores between workers and load this worker's own copy of the model.
+    `control` is the parent job's (cancel, resume) event pair.
+    """
+    global _worker_route
+    _worker_route = types.SimpleNamespace(queue=event_queue, path=None, track=None)
+    if control is not None:
+        # Tasks run on the thread that ran the initializer
+        _job_local.control = types.SimpleNamespace(cancel=control[0], resume=control[1])
+    _ensure_ml_imports()
+    if threads: torch.set_num_threads(threads)
+    load_ai_model(model_alias, device_pref, engine=engine)
+
+def _batch_worker_run(args):
+    with event_route(path=args.get("path"), track=args.get("audioTrack")):
+        process_file(args)
+    return args.get("path")
+
+def run_jobs(jobs, data, workers, relay):
+    """
+    Runs process_file over `jobs` and hands each of their events to
+    `relay(payload)`, tagged with the job's path (and audio track).
+    With more than one worker every job runs in a worker process holding its
+    own model, and at most `workers` jobs are in flight; otherwise they run one
+    after another in this process on the already loaded model. The calling
+    job's cancel and pause apply to all of them.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    control = getattr(_job_local, "control", None)
+
+    if workers <= 1:
+        # Not worth a process pool: run in-process on the already loaded model
+        queue = types.SimpleNamespace(put=relay)
+        for i, job in enumerate(jobs):
+            if control is not None and control.cancel.is_set():
+                _cancel_jobs(jobs[i:], relay); break
+            with event_route(queue=queue, path=job["path"], track=job.get("audioTrack")):
+                process_file(job)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    event_queue = ctx.Queue()
+    threads = max(1, (os.cpu_count() or 1) // workers)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=ctx,
+        initializer=_batch_worker_init,
+        initargs=(event_queue, data.get("model", "standard"), data.get("device", "auto"), threads,
+                  _control_events(control), data.get("engine", DEFAULT_ENGINE))
+    ) as pool:
+        pending = list(jobs)
+        running = {}
+        while pending or running:
+            if control is not None and control.cancel.is_set() and pending:
+                # Running files stop at their next window and report themselves
+                _cancel_jobs(pending, relay); pending = []
+            # Backpressure: never queue more files than there are workers (none while paused)
+            while pending and len(running) < workers and (control is None or control.resume.is_set()):
+                job = pending.pop(0)
+                running[pool.submit(_batch_worker_run, job)] = job
+
+            _forward_events(event_queue, relay, timeout=0.2)
+
+            for future in [f for f in running if f.done()]:
+                job = running.pop(future)
+                exc = future.exception()
+                if exc is not None:
+                    relay(dict({"type": "error", "message": f"Worker failed: {str(exc)}"}, **_job_tag(job)))
+
+    _forward_events(event_queue, relay)
+
+def process_batch(data):
+    """
+    Transcribes `data["paths"]` across a pool of worker processes, each holding
+    its own loaded model. All other keys are the same options as a single
+    `transcribe` command. At most `workers` files are in flight at once, where
+    `workers` is also limited by the RAM each model needs (MODEL_RAM_MB).
+    Every event of a batch job carries the file's "path".
+    """
+    paths = [p for p in data.get("paths", []) if p]
+    if not paths:
+        send_to_electron("error", "Batch is empty"); return
+
+    model_alias = data.get("model", "standard")
+    device_pref = data.get("device", "auto")
+    workers = min(len(paths), plan_worker_count(model_alias, device_pref, data.get("workers")))
+    jobs = []
+    for p in paths:
+        job = dict(data, command="transcribe", path=p)
+        job.pop("paths", None)
+        jobs.append(job)
+
+    send_to_electron("batch-start", f"Processing {len(paths)} files on {workers} worker(s)", {
+        "files": len(paths),
+        "workers": workers
+    })
+
+    started = time.time()
+    outcomes = {}
+    control = getattr(_job_local, "control", None)
+    relay = lambda payload: _relay_event(payload, outcomes)
+
+    if data.get("batchDecode") and not any(data.get(k) for k in BATCH_DECODE_EXCLUSIVE):
+        # Short clips: decoded together in this process, several per forward pass
+        short = [job for job in jobs if 0 < (media_duration(job["path"]) or 0) <= SHORT_CLIP_SECONDS]
+        if short:
+            try:
+                with event_route(queue=types.SimpleNamespace(put=relay)):
+                    process_short_clips(short, data)
+            except JobCancelled:
+                pass
+            done = set(id(job) for job in short)
+            jobs = [job for job in jobs if id(job) not in done]
+            if control is not None and control.cancel.is_set():
+                _cancel_jobs([job for job in short if job["path"] not in outcomes] + jobs, relay); jobs = []
+            workers = max(1, min(workers, len(jobs)))
+
+    if jobs:
+        run_jobs(jobs, data, workers, relay)
+
+    send_to_electron("batch-complete", "Batch finished", {
+        "files": len(paths),
+        "workers": workers,
+        "succeeded": sum(1 for v in outcomes.values() if v == "success"),
+        "failed": sum(1 for v in outcomes.values() if v == "error"),
+        "cancelled": sum(1 for v in outcomes.values() if v == "cancelled"),
+        "elapsed": round(time.time() - started, 2)
+    })
+
+# --- MULTI-TRACK TRANSCRIPTION ---
+def track_label(track, info=None):
+    """Output name tag of an audio track: "track1", or "track1_spa" when the stream has a language tag."""
+    language = (info or {}).get("language")
+    label = f"track{int(track)}"
+    if language and language != "und": label += f"_{language}"
+    return label
+
+def track_jobs(path, args):
+    """
+    One process_file request per entry of args["audioTracks"] (audio stream
+    positions, as in the analysis results' audioTracks[].audioIndex).
+    Raises ValueError for a track the file doesn't have.
+    """
+    known = {t["audioIndex"]: t for t in (media_info(path) or {}).get("audioTracks", [])}
+    jobs = []
+    for track in dict.fromkeys(int(t) for t in _as_list(args.get("audioTracks"), 0)):
+        if track < 0 or (known and track not in known):
+            raise ValueError(f"No audio track {track} in {os.path.basename(path)} ({len(known)} found)")
+        job = dict(args, audioTrack=track, trackLabel=track_label(track, known.get(track)))
+        job.pop("audioTracks", None)
+        jobs.append(job)
+    return jobs
+
+def process_tracks(args):
+    """
+    Transcribes several audio tracks of one file into separately named outputs.
+    One ffmpeg run extracts every track to its own temp WAV (the input is read
+    once; streaming modes decode each track in their own pipe instead), then the
+    tracks are transcribed concurrently by run_jobs, one model per worker
+    process, with as many workers as a batch would get.
+
+    Per-track results are sent as "track-success", "track-error" and
+    "track-cancelled" events carrying "audioTrack"; progress is the average
+    over the tracks. The file itself finishes with a single "success" that
+    lists every output (or "error"/"cancelled" when no track got through).
+    """
+    path = args["path"]
+    try:
+        jobs = track_jobs(path, args)
+    except ValueError as e:
+        send_to_electron("error", str(e), {"path": path}); return
+
+    control = getattr(_job_local, "control", None)
+    # Per-track events bypass send_to_electron's routing: inside a batch they
+    # go to the batch's queue, otherwise straight to stdout
+    route = _event_route()
+    outer = route.queue if route is not None else None
+    forward = outer.put if outer is not None else _emit
+    progress = {job["audioTrack"]: 0 for job in jobs}
+    finished = {}
+    shown = None
+
+    def relay(payload):
+        nonlocal shown
+        track = payload.get("audioTrack")
+        if track is None:
+            forward(payload)
+        elif payload["type"] == "progress":
+            progress[track] = payload.get("data") or 0
+            overall = int(sum(progress.values()) / len(progress))
+            if overall != shown:
+                shown = overall
+                forward(dict({k: v for k, v in payload.items() if k != "audioTrack"}, data=overall))
+        elif payload["type"] in ("success", "error", "cancelled"):
+            finished[track] = payload
+            forward(dict(payload, type=f"track-{payload['type']}"))
+        else:
+            forward(payload)
+
+    temp_paths = {}
+    if not any(args.get(k) for k in ("streaming", "live", "resumable")):
+        # Streaming jobs pipe their own track from ffmpeg instead (no temp WAV)
+        send_to_electron("info", f"Extracting {len(jobs)} audio track(s)")
+        temp_paths = extract_audio_tracks(path, list(progress)) or {}
+    for job in jobs:
+        # Without a pre-extracted WAV the job decodes its own track
+        if job["audioTrack"] in temp_paths: job["audioFile"] = temp_paths[job["audioTrack"]]
+
+    # A batch worker already routes its events through a queue: run the tracks here
+    workers = 1 if outer is not None else min(len(jobs), plan_worker_count(
+        args.get("model", "standard"), args.get("device", "auto"), args.get("workers")))
+    try:
+        run_jobs(jobs, args, workers, relay)
+    finally:
+        for temp_audio in temp_paths.values():
+            if os.path.exists(temp_audio): os.remove(temp_audio)
+
+    done = [finished[t] for t in progress if finished.get(t, {}).get("type") == "success"]
+    if control is not None and control.cancel.is_set() and len(done) < len(jobs):
+        send_to_electron("cancelled", "Cancelled", {"path": path}); return
+    if not done:
+        errors = [f"track {t}: {p['message']}" for t, p in finished.items() if p["type"] == "error"]
+        send_to_electron("error", "; ".join(errors) or "No audio track was transcribed", {"path": path}); return
+
+    save_paths = [p for d in done for p in d["data"]["savePaths"]]
+    send_to_electron("success", f"Done!", {
+        "path": path,
+        "savePath": save_paths[0],
+        "savePaths": save_paths,
+        "wordCount": sum(d["data"]["wordCount"] for d in done),
+        "confidence": round(sum(d["data"]["confidence"] for d in done) / len(done)),
+        "tracks": [
+            dict(audioTrack=t, status=finished.get(t, {}).get("type", "error"),
+                 savePaths=(finished.get(t, {}).get("data") or {}).get("savePaths", []))
+            for t in progress
+        ],
+    })
+
+# --- CHUNKED PARALLEL TRANSCRIPTION (LONG FILES) ---
+SILENCE_FRAME_MS = 30
+CHUNK_MIN_SECONDS = 120
+CHUNK_MAX_SECONDS = 900
+CHUNK_SEARCH_SECONDS = 20
+
+def frame_energy(audio, sr: int = SAMPLE_RATE, frame_ms=SILENCE_FRAME_MS):
+    """
+    Mean power of consecutive non-overlapping frames, computed without
+    materializing a squared copy of the whole signal.
+    """
+    frame_len = int(sr * frame_ms / 1000)
+    n_frames = len(audio) // frame_len
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32), frame_len
+    frames = audio[:n_frames * frame_len].reshape(n_frames, frame_len)
+    energy = np.einsum("ij,ij->i", frames, frames) / frame_len
+    return energy, frame_len
+
+def find_silence_splits(audio, chunk_seconds, sr: int = SAMPLE_RATE, search_seconds=CHUNK_SEARCH_SECONDS):
+    """
+    Splits `audio` into (start, end) sample ranges of roughly `chunk_seconds`,
+    moving every cut to the quietest frame within `search_seconds` of the
+    nominal position so no cut lands in the middle of a word.
+    """
+    total = len(audio)
+    if total <= chunk_seconds * sr:
+        return [(0, total)]
+
+    energy, frame_len = frame_energy(audio, sr)
+    # Smooth over ~0.3s so a single quiet frame inside a word doesn't win
+    smooth = max(1, int(0.3 * sr / frame_len))
+    energy = np.convolve(energy, np.ones(smooth, dtype=np.float32) / smooth, mode="same")
+
+    frames_per_chunk = int(chunk_seconds * sr / frame_len)
+    search = int(search_seconds * sr / frame_len)
+    cuts = []
+    nominal = frames_per_chunk
+    while nominal < len(energy) - search:
+        lo = max(nominal - search, (cuts[-1] if cuts else 0) + 1)
+        hi = min(nominal + search, len(energy))
+        cut = lo + int(np.argmin(energy[lo:hi]))
+        cuts.append(cut)
+        nominal = cut + frames_per_chunk
+
+    bounds = [0] + [c * frame_len for c in cuts] + [total]
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+def stitch_results(results, offsets):
+    """
+    Merges per-chunk Whisper results into one result whose segment and word
+    timestamps are on the original timeline. `offsets` are in seconds.
+    """
+    segments = []
+    for result, offset in zip(results, offsets):
+        for segment in result.get("segments", []):
+            segments.append(_shift_segment(segment, offset, len(segments)))
+    language = next((r.get("language") for r in results if r.get("language")), None)
+    return {
+        "text": "".join(s["text"] for s in segments),
+        "segments": segments,
+        "language": language,
+    }
+
+def _detect_language(model, audio):
+    mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), model.dims.n_mels).to(model.device)
+    _, probs = model.detect_language(mel)
+    return max(probs, key=probs.get)
+
+def _chunk_worker_run(audio, opts):
+    return current_model.transcribe(audio, **opts)
+
+def transcribe_chunked(model, audio, opts, model_alias, device_pref, workers=None, progress=None, sr: int = SAMPLE_RATE,
+                       engine=DEFAULT_ENGINE):
+    """
+    Splits a long decoded track at silences and transcribes the chunks in
+    parallel worker processes (one model each), then stitches the results.
+    Falls back to a single model.transcribe call when only one worker fits.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    duration = len(audio) / sr
+    workers = plan_worker_count(model_alias, device_pref, workers)
+    chunk_seconds = min(max(duration / (workers * 2), CHUNK_MIN_SECONDS), CHUNK_MAX_SECONDS)
+    bounds = find_silence_splits(audio, chunk_seconds, sr)
+
+    if workers <= 1 or len(bounds) <= 1:
+        return model.transcribe(audio, **opts)
+
+    opts = dict(opts)
+    if "language" not in opts:
+        # Every chunk must use the same language; detect it once up front
+        opts["language"] = _detect_language(model, audio)
+
+    ctx = multiprocessing.get_context("spawn")
+    event_queue = ctx.Queue()
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    # Chunk workers' events go out like this job's own (same route and tags)
+    relay = lambda payload: send_to_electron(**payload)
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(bounds)),
+        mp_context=ctx,
+        initializer=_batch_worker_init,
+        initargs=(event_queue, model_alias, device_pref, threads,
+                  _control_events(getattr(_job_local, "control", None)), engine)
+    ) as pool:
+        futures = [pool.submit(_chunk_worker_run, audio[s:e], opts) for s, e in bounds]
+        try:
+            while not all(f.done() for f in futures):
+                job_checkpoint()
+                _forward_events(event_queue, relay, timeout=0.2)
+                if progress:
+                    progress.advance(sum((e - s) / sr for f, (s, e) in zip(futures, bounds) if f.done()))
+        except JobCancelled:
+            # Chunks already running stop at their next window (they share the events)
+            for f in futures: f.cancel()
+            raise
+        results = [f.result() for f in futures]
+
+    _forward_events(event_queue, relay)
+    return stitch_results(results, [s / sr for s, _ in bounds])
+
+# --- BATCHED DECODING (SHORT CLIPS) ---
+SHORT_CLIP_SECONDS = 30   # fits in one Whisper window: one decode per clip, no seeking
+BATCH_DECODE_SIZE = 16    # clips per forward pass
+# These change how a file is transcribed, so such batches take the per-file path
+BATCH_DECODE_EXCLUSIVE = ("vad", "streaming", "live", "resumable", "chunked", "audioTracks")
+
+def _window_segments(tokens, tokenizer, duration):
+    """
+    Splits the decoded tokens of one window into (start, end, text tokens)
+    at its timestamp tokens, following whisper.transcribe's rules. Text after
+    the last timestamp pair (which transcribe would re-decode from a later
+    seek) ends at the end of the clip.
+    """
+    ts_begin = tokenizer.timestamp_begin
+    precision = 0.02  # seconds per timestamp token
+    is_ts = [t >= ts_begin for t in tokens]
+    slices = [i + 1 for i in range(len(tokens) - 1) if is_ts[i] and is_ts[i + 1]]
+
+    spans = []
+    if slices:
+        if is_ts[-2:] == [False, True]:
+            slices.append(len(tokens))  # single timestamp ending: the last segment is complete
+        last = 0
+        for current in slices:
+            part = tokens[last:current]
+            spans.append(((part[0] - ts_begin) * precision, (part[-1] - ts_begin) * precision, part))
+            last = current
+        tail = tokens[last:]
+        if any(t < tokenizer.eot for t in tail):
+            start = (tail[0] - ts_begin) * precision if tail[0] >= ts_begin else spans[-1][1]
+            spans.append((start, duration, tail))
+    else:
+        stamps = [t for t in tokens if t >= ts_begin]
+        end = duration
+        if stamps and stamps[-1] != ts_begin:
+            end = (stamps[-1] - ts_begin) * precision
+        spans.append((0.0, end, tokens))
+
+    return [
+        (min(start, duration), min(max(end, start), duration), [t for t in part if t < tokenizer.eot])
+        for start, end, part in spans
+    ]
+
+def decode_short_batch(model, audios, opts):
+    """
+    Transcribes clips of at most SHORT_CLIP_SECONDS with one encoder/decoder
+    pass per language instead of one model.transcribe call per clip: their
+    log-mel spectrograms are padded to a full window and stacked. Returns a
+    model.transcribe-style result per clip. Word alignment still runs per clip
+    (one extra forward pass each); clips whose decode looks unreliable (the
+    same thresholds transcribe uses for temperature fallback) are redone with
+    model.transcribe.
+    """
+    from whisper.audio import N_FRAMES, N_SAMPLES
+    from whisper.tokenizer import get_tokenizer
+    from whisper.timing import add_word_timestamps
+
+    task = opts.get("task", "transcribe")
+    fp16 = model.device.type == "cuda"
+    mels, frames = [], []
+    for audio in audios:
+        mel = whisper.log_mel_spectrogram(audio, model.dims.n_mels, padding=N_SAMPLES, device=model.device)
+        content = mel.shape[-1] - N_FRAMES
+        mels.append(whisper.pad_or_trim(mel[:, :content], N_FRAMES))
+        frames.append(content)
+    batch = torch.stack(mels)
+
+    if opts.get("language"):
+        languages = [opts["language"]] * len(audios)
+    elif not model.is_multilingual:
+        languages = ["en"] * len(audios)
+    else:
+        _, probs = model.detect_language(batch.half() if fp16 else batch)
+        languages = [max(p, key=p.get) for p in probs]
+
+    results = [None] * len(audios)
+    for language in dict.fromkeys(languages):
+        index = [i for i, lang in enumerate(languages) if lang == language]
+        tokenizer = get_tokenizer(
+            model.is_multilingual, num_languages=model.num_languages, language=language, task=task
+        )
+        options = whisper.DecodingOptions(task=task, language=language, temperature=0.0, fp16=fp16)
+        decoded = whisper.decode(model, batch[index], options)
+
+        for i, d in zip(index, decoded):
+            duration = len(audios[i]) / SAMPLE_RATE
+            if d.no_speech_prob > 0.6 and d.avg_logprob < -1.0:
+                results[i] = {"text": "", "segments": [], "language": language}
+                continue
+            if d.compression_ratio > 2.4 or d.avg_logprob < -1.0:
+                results[i] = model.transcribe(audios[i], **dict(opts, language=language))
+                continue
+
+            segments = [{
+                "id": n, "seek": 0, "start": start, "end": end,
+                "text": tokenizer.decode(text_tokens), "tokens": text_tokens,
+                "temperature": 0.0, "avg_logprob": d.avg_logprob,
+                "compression_ratio": d.compression_ratio, "no_speech_prob": d.no_speech_prob,
+            } for n, (start, end, text_tokens) in enumerate(_window_segments(d.tokens, tokenizer, duration))]
+            segments = [s for s in segments if s["tokens"]]
+            if segments and opts.get("word_timestamps"):
+                add_word_timestamps(
+                    segments=segments, model=model, tokenizer=tokenizer,
+                    mel=batch[i], num_frames=frames[i], last_speech_timestamp=0.0
+                )
+            results[i] = {"text": "".join(s["text"] for s in segments), "segments": segments, "language": language}
+    return results
+
+@models_held()
+def process_short_clips(jobs, data):
+    """
+    Batch path for clips of at most SHORT_CLIP_SECONDS: decodes up to
+    BATCH_DECODE_SIZE uncached clips per forward pass on this process's model,
+    then hands each result to process_file for caching and output.
+    """
+    model_alias = data.get("model", "standard")
+    device_pref = data.get("device", "auto")
+    engine = resolve_engine(data.get("engine", DEFAULT_ENGINE), get_device(device_pref))
+    cache_name = job_cache_name(data, engine)
+    use_cache = data.get("cache", True) is not False
+    opts = {"word_timestamps": True, "verbose": False}
+    if data.get("language") and data.get("language") != "auto":
+        opts["language"] = data.get("language")
+
+    model = load_ai_model(model_alias, device_pref, engine=engine, hold=True)
+    if not model:
+        for job in jobs:
+            with event_route(path=job["path"]):
+                send_to_electron("error", getattr(_job_local, "load_error", "Failed to load model"),
+                                 {"path": job["path"]})
+        return
+
+    for start in range(0, len(jobs), BATCH_DECODE_SIZE):
+        job_checkpoint()
+        pending = []
+        for job in jobs[start:start + BATCH_DECODE_SIZE]:
+            with event_route(path=job["path"]):
+                if use_cache and cache_lookup_source(job["path"], cache_name, opts.get("language")) is not None:
+                    process_file(job)  # answered from the cache
+                    continue
+                try:
+                    audio = custom_load_audio(job["path"])
+                except Exception as e:
+                    send_to_electron("error", str(e), {"path": job["path"]}); continue
+                if len(audio) > SHORT_CLIP_SECONDS * SAMPLE_RATE:
+                    # Container duration was short (VBR, rounding): one window would drop the tail
+                    process_file(job)
+                    continue
+                pending.append((job, audio))
+        if not pending: continue
+
+        t0 = time.perf_counter()
+        try:
+            results = decode_short_batch(model, [audio for _, audio in pending], opts)
+        except JobCancelled:
+            raise
+        except Exception as e:
+            # Batched decoding failed: transcribe this group one file at a time
+            send_to_electron("info", f"Batched decoding failed ({str(e)}), transcribing files one by one")
+            for job, _ in pending:
+                with event_route(path=job["path"]):
+                    process_file(job)
+            continue
+        share = (time.perf_counter() - t0) / len(pending)
+
+        for (job, audio), result in zip(pending, results):
+            with event_route(path=job["path"]):
+                process_file(job, transcript={
+                    "result": result,
+                    "audioHash": hash_audio(audio),
+                    "audioSeconds": len(audio) / SAMPLE_RATE,
+                    "inferenceSeconds": share,
+                })
+
+# --- VOICE ACTIVITY DETECTION (SKIP SILENCE BEFORE INFERENCE) ---
+VAD_MARGIN_DB = 10.0       # speech must be this far above the noise floor...
+VAD_MIN_THRESHOLD_DB = -60.0
+VAD_MAX_THRESHOLD_DB = -35.0  # ...but anything louder than this always counts
+VAD_MIN_SPEECH_SECONDS = 0.25
+VAD_MIN_SILENCE_SECONDS = 1.0
+VAD_PAD_SECONDS = 0.3
+
+def detect_speech_regions(audio, sr: int = SAMPLE_RATE,
+                          min_speech=VAD_MIN_SPEECH_SECONDS,
+                          min_silence=VAD_MIN_SILENCE_SECONDS,
+                          pad=VAD_PAD_SECONDS):
+    """
+    Energy-based VAD. Returns an (N, 2) int64 array of [start, end) sample
+    ranges that contain speech, padded by `pad` seconds and with gaps shorter
+    than `min_silence` closed. All steps are vectorized over frames.
+    """
+    energy, frame_len = frame_energy(audio, sr)
+    if not len(energy):
+        return np.zeros((0, 2), dtype=np.int64)
+
+    db = 10.0 * np.log10(energy + 1e-10)
+    noise_floor = np.percentile(db, 10)
+    threshold = np.clip(noise_floor + VAD_MARGIN_DB, VAD_MIN_THRESHOLD_DB, VAD_MAX_THRESHOLD_DB)
+    mask = db > threshold
+
+    # Run boundaries of the speech mask
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if not len(starts):
+        return np.zeros((0, 2), dtype=np.int64)
+
+    frame_sec = frame_len / sr
+
+    # Close short pauses: keep a boundary only where the gap is long enough
+    keep = (starts[1:] - ends[:-1]) * frame_sec >= min_silence
+    starts = starts[np.concatenate(([True], keep))]
+    ends = ends[np.concatenate((keep, [True]))]
+
+    # Drop blips that are too short to be speech
+    long_enough = (ends - starts) * frame_sec >= min_speech
+    starts, ends = starts[long_enough], ends[long_enough]
+    if not len(starts):
+        return np.zeros((0, 2), dtype=np.int64)
+
+    pad_samples = int(pad * sr)
+    regions = np.stack((starts * frame_len - pad_samples, ends * frame_len + pad_samples), axis=1)
+    np.clip(regions, 0, len(audio), out=regions)
+
+    # Padding can make neighbours overlap again: merge them
+    overlap = regions[1:, 0] <= regions[:-1, 1]
+    if overlap.any():
+        new_start = np.concatenate(([True], ~overlap))
+        new_end = np.concatenate((~overlap, [True]))
+        regions = np.stack((regions[new_start, 0], regions[new_end, 1]), axis=1)
+    return regions.astype(np.int64)
+
+def compact_speech(audio, regions):
+    """
+    Concatenates the speech regions into one array. Returns it together with
+    the start of every region on the compacted and on the original timeline
+    (in samples), which is all remap_result() needs.
+    """
+    lengths = regions[:, 1] - regions[:, 0]
+    compact_starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    compact = np.empty(int(lengths.sum()), dtype=np.float32)
+    for (s, e), c in zip(regions, compact_starts):
+        compact[c:c + (e - s)] = audio[s:e]
+    return compact, compact_starts, regions[:, 0].copy()
+
+def remap_result(result, compact_starts, original_starts, sr: int = SAMPLE_RATE):
+    """
+    Moves every segment and word timestamp of a result produced on compacted
+    audio back onto the original timeline (in place).
+    """
+    segments = result.get("segments", [])
+    refs = []
+    for seg in segments:
+        refs.append(seg)
+        refs.extend(seg.get("words", []))
+    if not refs:
+        return result
+
+    c_starts = compact_starts / sr
+    o_starts = original_starts / sr
+    times = np.array([(r["start"], r["end"]) for r in refs], dtype=np.float64)
+
+    # Starts belong to the region they begin in; ends to the region they finish in
+    idx = np.searchsorted(c_starts, times, side="right") - 1
+    end_idx = np.searchsorted(c_starts, times[:, 1], side="left") - 1
+    idx[:, 1] = np.maximum(end_idx, 0)
+    np.clip(idx, 0, len(c_starts) - 1, out=idx)
+    mapped = o_starts[idx] + (times - c_starts[idx])
+
+    for r, (s, e) in zip(refs, mapped):
+        r["start"] = round(float(s), 3)
+        r["end"] = round(float(max(e, s)), 3)
+    return result
+
+def transcribe_with_vad(audio, transcribe_fn, sr: int = SAMPLE_RATE):
+    """
+    Runs `transcribe_fn(audio)` on speech regions only and maps the result
+    back. Returns (result, stats) where stats reports how much was skipped.
+    """
+    total = len(audio) / sr
+    regions = detect_speech_regions(audio, sr)
+
+    if not len(regions):
+        result = {"text": "", "segments": [], "language": None}
+        kept = 0.0
+    else:
+        compact, compact_starts, original_starts = compact_speech(audio, regions)
+        kept = len(compact) / sr
+        result = transcribe_fn(compact)
+        del compact
+        remap_result(result, compact_starts, original_starts, sr)
+
+    stats = {
+        "totalSeconds": round(total, 2),
+        "speechSeconds": round(kept, 2),
+        "skippedSeconds": round(total - kept, 2),
+        "regions": int(len(regions)),
+    }
+    return result, stats
+
+def report_vad_stats(stats):
+    total = stats["totalSeconds"]
+    pct = round(100 * stats["skippedSeconds"] / total) if total else 0
+    send_to_electron("info", f"Skipped {stats['skippedSeconds']:.0f}s of silence ({pct}%)", stats)
+
+# --- JOB QUEUE & CONTROL ---
+# stdin is read on its own thread (see _read_commands), so "analyze", "cancel"
+# etc. are handled while a transcription runs. Transcriptions are queued and
+# each runs on its own thread; the loaded models are shared by all of them.
+_jobs_cond = threading.Condition()
+_pending_jobs = []  # queued, not started yet
+_active_jobs = []   # started; the last one runs, earlier ones are preempted
+_job_seq = itertools.count(1)
+_shutting_down = False
+
+class JobCancelled(Exception):
+    """Raised at the next window boundary of a job that has been cancelled."""
+
+class Job:
+    """
+    A queued "transcribe" or "transcribe_batch" command. `cancel` and `resume`
+    are multiprocessing events so batch and chunk worker processes see them too.
+    Higher `priority` runs first; a single-file job with a higher priority than
+    the running single-file job preempts it (pauses it at its next window).
+    """
+    def __init__(self, data):
+        import multiprocessing
+        ctx = multiprocessing.get_context("spawn")
+        self.seq = next(_job_seq)
+        self.data = data
+        self.command = data.get("command")
+        self.id = str(data.get("jobId") or data.get("path") or f"job-{self.seq}")
+        self.priority = _job_priority(data.get("priority"))
+        self.cancel = ctx.Event()
+        self.resume = ctx.Event()
+        self.paused = False     # paused by a "pause" command
+        self.preempted = False  # paused for a higher-priority job
+        self.sync()
+
+    def sync(self):
+        if self.paused or self.preempted:
+            self.resume.clear()
+        else:
+            self.resume.set()
 
+    def describe(self, **extra):
+        return dict({"jobId": self.id, "path": self.data.get("path"), "priority": self.priority}, **extra)
+
+def _job_priority(value):
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def _control_events(control):
+    """The (cancel, resume) pair handed to worker processes, or None."""
+    if control is None: return None
+    return (control.cancel, control.resume)
+
+def job_checkpoint():
+    """
+    Called by the running job at window boundaries: blocks while the job is
+    paused and raises JobCancelled once it has been cancelled.
+    """
+    control = getattr(_job_local, "control", None)
+    if control is None: return
+    while not control.resume.is_set() and not control.cancel.is_set():
+        control.resume.wait(0.25)
+    if control.cancel.is_set():
+        raise JobCancelled()
+
+def _job_event(type, message, data):
+    # Straight to stdout: control events are about the job, not the file it
+    # is working on (and may be sent from the job's own routed thread)
+    _emit({"type": type, "message": message, "data": data})
+
+def _can_preempt(job, running):
+    # A paused batch or multi-track file only stops starting new files (its
+    # workers keep running), so only single files swap places
+    single = lambda j: j.command == "transcribe" and not j.data.get("audioTracks")
+    return single(job) and single(running) and job.priority > running.priority and _fits_beside_active(job)
+
+def _job_model_key(job):
+    data = job.data
+    return _model_key(data.get("model", "standard"), data.get("device", "auto"), data.get("engine", DEFAULT_ENGINE))
+
+def _fits_beside_active(job):
+    """
+    Whether `job`'s model fits in the budget next to the models of the started
+    jobs, which stay loaded while they are paused (and may not be loaded yet).
+    Call with _jobs_cond held.
+    """
+    key = _job_model_key(job)
+    with _model_pool_lock:
+        if key in _model_pool or key in _model_loading: return True
+        keys = {_job_model_key(j) for j in _active_jobs} | set(_model_users) | set(_model_loading)
+        used = sum(MODEL_RAM_MB.get(k[0], MODEL_RAM_MB["base"]) for k in keys if k[1] == key[1])
+        return used + MODEL_RAM_MB.get(key[0], MODEL_RAM_MB["base"]) <= _model_budget_mb(key[1])
+
+def _next_pending_job():
+    """The queued job that starts next, or None. Call with _jobs_cond held."""
+    ready = [j for j in _pending_jobs if not j.paused]
+    return min(ready, key=lambda j: (-j.priority, j.seq)) if ready else None
+
+def _schedule():
+    """Starts or resumes whatever should run now. Call with _jobs_cond held."""
+    job = _next_pending_job()
+    top = _active_jobs[-1] if _active_jobs else None
+
+    if top is not None and (job is None or not _can_preempt(job, top)):
+        if top.preempted:
+            top.preempted = False
+            top.sync()
+            _job_event("resumed", "Job resumed", top.describe())
+        return
+    if job is None: return
+
+    if top is not None and not top.preempted:
+        top.preempted = True
+        top.sync()
+        _job_event("paused", f"Paused for {job.id}", top.describe(preempted=True))
+    _pending_jobs.remove(job)
+    _active_jobs.append(job)
+    threading.Thread(target=_run_job, args=(job,), name=f"job-{job.seq}").start()
+
+def _run_job(job):
+    _job_local.control = job
+    try:
+        if job.command == "transcribe_batch":
+            process_batch(job.data)
+        else:
+            process_file(job.data)
+    except Exception as e:
+        send_to_electron("error", str(e), {"path": job.data.get("path")})
+    finally:
+        with _jobs_cond:
+            _active_jobs.remove(job)
+            _schedule()
+            _jobs_cond.notify_all()
+
+def submit_job(data):
+    job = Job(data)
+    with _jobs_cond:
+        _pending_jobs.append(job)
+        _schedule()
+        if job in _pending_jobs:
+            _job_event("queued", "Job queued", job.describe(position=len(_pending_jobs)))
+    return job
+
+def _find_job(job_id):
+    if job_id is None:
+        return _active_jobs[-1] if _active_jobs else None
+    for job in _active_jobs + _pending_jobs:
+        if job.id == str(job_id): return job
+    return None
+
+def control_job(cmd, data):
+    """Handles "cancel", "pause", "resume" and "reprioritize" ("jobId" defaults to the running job)."""
+    with _jobs_cond:
+        job = _find_job(data.get("jobId"))
+        if job is None:
+            send_to_electron("info", f"No such job: {data.get('jobId')}"); return
+
+        if cmd == "cancel":
+            job.cancel.set()
+            if job in _pending_jobs:
+                _pending_jobs.remove(job)
+                _job_event("cancelled", "Cancelled", job.describe())
+            # A started job stops at its next window boundary and reports itself
+        elif cmd == "pause":
+            job.paused = True
+            job.sync()
+            _job_event("paused", "Job paused", job.describe())
+        elif cmd == "resume":
+            job.paused = False
+            job.sync()
+            _job_event("resumed", "Job resumed", job.describe())
+        elif cmd == "reprioritize":
+            job.priority = _job_priority(data.get("priority"))
+        _schedule()
+
+def handle_command(data):
+    cmd = data.get("command")
+
+    if cmd == "analyze":
+        # One "path" or a list of "paths"; never blocks the command loop
+        analyze_files(data.get("paths") or [data.get("path")], bool(data.get("preview")))
+    elif cmd in ("transcribe", "transcribe_batch"):
+        submit_job(data)
+    elif cmd in ("cancel", "pause", "resume", "reprioritize"):
+        control_job(cmd, data)
+    elif cmd == "render":
+        request_render(data)
+    elif cmd == "preload":
+        configure_model_pool(data)
+        if data.get("nextModel"): preload_next_model(data)
+        if data.get("model"):
+            preload_model(data["model"], data.get("device", "auto"), data.get("engine", DEFAULT_ENGINE))
+
+def _read_commands():
+    """
+    stdin reader thread. At EOF no new jobs are accepted; queued ones still run
+    (so piped command files work as before).
+    """
+    global _shutting_down
     while True:
+        line = sys.stdin.readline()
+        if not line: break
         try:
-            line = sys.stdin.readline()
-            if not line: break
             data = json.loads(line)
-            cmd = data.get("command")
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(data, dict): continue
+        # A bad command must not end the reader: main() would wait forever
+        try:
+            handle_command(data)
+        except Exception as e:
+            send_to_electron("error", f"Command failed: {str(e)}", {"command": data.get("command")})
+    with _jobs_cond:
+        _shutting_down = True
+        _jobs_cond.notify_all()
+
+def cancel_all_jobs():
+    with _jobs_cond:
+        for job in _pending_jobs + _active_jobs:
+            job.cancel.set()
+        _pending_jobs.clear()
+
+# --- HEADLESS CLI / WATCH FOLDER ---
+# python engine.py run <files, folders or globs> [options]
+# python engine.py watch <folder> [options]
+MEDIA_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".mp3", ".wav", ".m4a")  # same as the app's file dialog
+
+def _headless_parser():
+    import argparse
+    parser = argparse.ArgumentParser(prog="engine", description="Transcribe media files without the app.")
+    modes = parser.add_subparsers(dest="mode", required=True)
+    run = modes.add_parser("run", help="transcribe files, folders or glob patterns")
+    run.add_argument("inputs", nargs="+")
+    watch = modes.add_parser("watch", help="keep transcribing new media that appears in a folder")
+    watch.add_argument("folder")
+    watch.add_argument("--interval", type=float, default=5.0, help="seconds between folder scans")
+
+    for p in (run, watch):
+        p.add_argument("-r", "--recursive", action="store_true", help="include subfolders")
+        p.add_argument("--model", default="standard", choices=list(MODEL_MAP))
+        p.add_argument("--device", default="auto", choices=("auto", "cpu", "cuda"))
+        p.add_argument("--engine", default=DEFAULT_ENGINE, choices=INFERENCE_ENGINES)
+        p.add_argument("--language", default="auto")
+        p.add_argument("--format", action="append", dest="formats", choices=("srt", "vtt", "txt"),
+                       help="output format (repeat for several; default srt)")
+        p.add_argument("--preset", action="append", dest="presets", help="standard or tiktok (repeat for several)")
+        p.add_argument("--output-dir", help="default: next to each input")
+        p.add_argument("--output-name", default="subs", help="suffix of the output file names")
+        p.add_argument("--max-chars", type=int, default=42)
+        p.add_argument("--max-lines", type=int, default=2)
+        p.add_argument("--profanity", action="store_true", help="mask profanity")
+        p.add_argument("--reflow", action="store_true",
+                       help="time cues for reading speed, min/max duration and gaps (see REFLOW_DEFAULTS)")
+        p.add_argument("--workers", type=int, help="parallel transcriptions (default: as many as fit in memory)")
+        p.add_argument("--audio-track", type=int, action="append", dest="audio_tracks",
+                       help="audio stream to transcribe, counted from 0 (repeat for several; default: ffmpeg's pick)")
+        p.add_argument("--options", help="extra JSON protocol options, e.g. '{\"vad\": true}'")
+        p.add_argument("--force", action="store_true", help="also transcribe files whose outputs are up to date")
+        p.add_argument("--report", help="write the summary report (JSON) to this file")
+        p.add_argument("-q", "--quiet", action="store_true", help="print only errors instead of every event")
+    return parser
+
+def _headless_job(args):
+    """The transcribe_batch options (same keys as the JSON protocol) for the CLI arguments."""
+    job = {
+        "model": args.model,
+        "device": args.device,
+        "engine": args.engine,
+        "language": args.language,
+        "formats": args.formats or ["srt"],
+        "presets": args.presets or ["standard"],
+        "outputName": args.output_name,
+        "maxChars": args.max_chars,
+        "maxLines": args.max_lines,
+        "profanity": args.profanity,
+        "workers": args.workers,
+    }
+    if args.reflow:
+        job["reflow"] = True
+    if args.audio_tracks:
+        job["audioTracks"] = args.audio_tracks
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+        job["outputDir"] = os.path.abspath(args.output_dir)
+    if args.options:
+        job.update(args.options)  # parsed and checked by run_headless
+    return job
+
+def collect_media(inputs, recursive=False):
+    """
+    Media files named by `inputs`: files (taken as given), folders and glob
+    patterns (filtered by MEDIA_EXTENSIONS). Sorted per input, no duplicates.
+    """
+    import glob
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            if recursive:
+                names = [os.path.join(root, n) for root, _, files in os.walk(item) for n in files]
+            else:
+                names = [os.path.join(item, n) for n in os.listdir(item)]
+            found += sorted(n for n in names if os.path.isfile(n) and n.lower().endswith(MEDIA_EXTENSIONS))
+        elif any(c in item for c in "*?["):
+            matches = glob.glob(item, recursive=True)
+            found += sorted(m for m in matches if os.path.isfile(m) and m.lower().endswith(MEDIA_EXTENSIONS))
+        elif os.path.isfile(item):
+            found.append(item)
+    return list(dict.fromkeys(os.path.abspath(f) for f in found))
+
+def _job_signature(job):
+    import hashlib
+    options = {k: v for k, v in job.items() if k not in ("workers", "paths", "path")}
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode("utf-8")).hexdigest()
+
+def _load_ledger():
+    try:
+        with open(os.path.join(app_cache_dir("headless"), "processed.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_ledger(ledger):
+    _write_json_atomic(os.path.join(app_cache_dir("headless"), "processed.json"), ledger)
+
+def is_up_to_date(path, job, ledger):
+    """
+    True if every output `job` would write for `path` exists and is current:
+    newer than the source, or (source touched but unchanged) recorded in the
+    ledger with the same content hash. Different options mean not current.
+    """
+    try:
+        jobs = track_jobs(path, job) if job.get("audioTracks") else [job]
+    except ValueError:
+        return False
+    targets = []
+    for one in jobs:
+        outputs, sidecar_path = plan_outputs(path, one)
+        targets += [o[0] for o in outputs] + ([sidecar_path] if job.get("sidecar") else [])
+    if not all(os.path.exists(t) for t in targets): return False
+
+    entry = ledger.get(path)
+    if entry and entry.get("options") != _job_signature(job): return False
+    source_mtime = os.path.getmtime(path)
+    if all(os.path.getmtime(t) >= source_mtime for t in targets): return True
+    return bool(entry) and entry.get("hash") == quick_content_hash(path)
+
+def _run_headless_batch(paths, job, files, quiet):
+    """Runs process_batch on `paths` and records every file's outcome in `files`."""
+    global _event_tap
+
+    def tap(payload):
+        data = payload.get("data") if isinstance(payload.get("data"), dict) else {}
+        path = payload.get("path") or data.get("path")
+        kind = payload["type"]
+        if path and kind in ("success", "error", "cancelled"):
+            entry = files.setdefault(path, {"path": path})
+            entry["status"] = kind
+            if kind == "success": entry["outputs"] = data.get("savePaths")
+            if kind == "error": entry["error"] = payload.get("message")
+        elif path and kind == "metrics":
+            entry = files.setdefault(path, {"path": path})
+            entry["audioSeconds"] = data.get("audioSeconds")
+            entry["seconds"] = data.get("totalSeconds")
+            entry["cached"] = data.get("cached")
+        return not quiet or kind == "error"
+
+    _event_tap = tap
+    try:
+        process_batch(dict(job, paths=paths))
+    finally:
+        _event_tap = None
+
+def headless_summary(files, skipped, started):
+    """
+    Summary report: per-file outcomes plus totals and throughput. Files
+    answered from the transcript cache count as "cached", not "transcribed",
+    and are left out of the audio and throughput figures.
+    """
+    wall = time.time() - started
+    entries = list(files.values())
+    count = lambda status: sum(1 for e in entries if e.get("status") == status)
+    transcribed = [e for e in entries if e.get("status") == "success" and not e.get("cached")]
+    audio = sum(e.get("audioSeconds") or 0 for e in transcribed)
+    return {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+        "wallSeconds": round(wall, 2),
+        "files": len(entries) + len(skipped),
+        "succeeded": count("success"),
+        "transcribed": len(transcribed),
+        "cached": count("success") - len(transcribed),
+        "failed": count("error"),
+        "cancelled": count("cancelled"),
+        "skipped": len(skipped),
+        "audioSeconds": round(audio, 1),
+        # audio seconds transcribed per wall-clock second, over the whole run
+        "throughput": round(audio / wall, 2) if transcribed and wall > 0 else None,
+        "filesPerHour": round(len(transcribed) * 3600 / wall, 1) if transcribed and wall > 0 else None,
+        "results": entries,
+        "skippedFiles": skipped,
+    }
+
+def _finish_headless(report_path, files, skipped, started):
+    summary = headless_summary(files, skipped, started)
+    if report_path:
+        _write_json_atomic(report_path, summary)
+    line = (f"{summary['transcribed']} transcribed, {summary['cached']} from cache, "
+            f"{summary['failed']} failed, {summary['skipped']} skipped")
+    if summary["throughput"] is not None:
+        line += (f": {summary['audioSeconds']}s of audio in {summary['wallSeconds']}s "
+                 f"({summary['throughput']}x real time)")
+    sys.stderr.write(line + "\n")
+    return summary
+
+def _transcribe_pending(paths, job, args, ledger, files, skipped):
+    todo = []
+    for path in paths:
+        if not args.force and is_up_to_date(path, job, ledger):
+            skipped.append(path)
+        else:
+            todo.append(path)
+    if not todo: return
+    _run_headless_batch(todo, job, files, args.quiet)
+
+    signature = _job_signature(job)
+    for path in todo:
+        if files.get(path, {}).get("status") == "success":
+            ledger[path] = {"hash": quick_content_hash(path), "options": signature}
+    _save_ledger(ledger)
+
+def run_headless(argv=None):
+    """
+    Headless entry point: the same transcription options as the JSON protocol,
+    for a fixed set of inputs ("run") or a watched folder ("watch"). Events are
+    printed as JSON lines; a summary goes to stderr and, with --report, to a
+    JSON file. Returns the exit status (1 if any file failed).
+    """
+    parser = _headless_parser()
+    args = parser.parse_args(argv)
+    if args.options:
+        try:
+            args.options = json.loads(args.options)
+        except json.JSONDecodeError as e:
+            parser.error(f"--options is not valid JSON: {e}")
+        if not isinstance(args.options, dict):
+            parser.error("--options must be a JSON object")
+    job = _headless_job(args)
+    ledger = _load_ledger()
+    files, skipped = {}, []
+    started = time.time()
+
+    try:
+        if args.mode == "run":
+            paths = collect_media(args.inputs, args.recursive)
+            if not paths:
+                sys.stderr.write("No media files found\n")
+                return 1
+            _transcribe_pending(paths, job, args, ledger, files, skipped)
+        else:
+            # A file is picked up once its size and mtime held still for one
+            # interval (i.e. it is no longer being copied in)
+            last_seen, handled = {}, {}
+            while True:
+                ready = []
+                for path in collect_media([args.folder], args.recursive):
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    sig = (st.st_size, st.st_mtime_ns)
+                    if last_seen.get(path) == sig and handled.get(path) != sig:
+                        ready.append(path)
+                        handled[path] = sig
+                    last_seen[path] = sig
+                if ready:
+                    _transcribe_pending(ready, job, args, ledger, files, skipped)
+                    if args.report: _write_json_atomic(args.report, headless_summary(files, skipped, started))
+                time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    summary = _finish_headless(args.report, files, skipped, started)
+    return 1 if summary["failed"] else 0
+
+# --- STARTUP / WARM START ---
+_last_model_state = None
+
+def _engine_state_path():
+    return os.path.join(app_cache_dir(), "engine_state.json")
+
+def _remember_last_model(model_alias, device_pref):
+    """
+    Persists the last model the user transcribed with, for warm starts.
+    """
+    global _last_model_state
+    state = {"model": model_alias, "device": device_pref}
+    if _last_model_state == state: return
+    _last_model_state = state
+    try:
+        _write_json_atomic(_engine_state_path(), state)
+    except OSError:
+        pass
 
-            if cmd == "analyze":
-                analyze_file(data.get("path"))
-            elif cmd == "transcribe":
-                process_file(data)
-                
-        except json.JSONDecodeError: pass
-        except KeyboardInterrupt: break
+def _last_model():
+    try:
+        with open(_engine_state_path(), "r", encoding="utf-8") as f:
+            state = json.load(f)
+        return state.get("model"), state.get("device", "auto")
+    except (OSError, ValueError):
+        return None, None
+
+def warm_start_enabled():
+    return "--warm-start" in sys.argv[1:] or os.environ.get("V2S_WARM_START") == "1"
+
+def _startup_stages(warm_start):
+    """
+    Background part of startup: import torch/whisper, probe the device and
+    optionally load the last used model. Reports the timing of every stage.
+    """
+    try:
+        _ensure_ml_imports()
+
+        t0 = time.perf_counter()
+        device = get_device()
+        startup_timings["deviceProbe"] = round((time.perf_counter() - t0) * 1000)
+        send_to_electron("info", f"System: {device.upper()} Acceleration Detected")
+
+        if warm_start:
+            model_alias, device_pref = _last_model()
+            if model_alias:
+                t0 = time.perf_counter()
+                if load_ai_model(model_alias, device_pref, background=True) is not None:
+                    startup_timings["warmStart"] = round((time.perf_counter() - t0) * 1000)
+                    startup_timings["warmModel"] = model_alias
+
+        startup_timings["total"] = round((time.perf_counter() - _PROCESS_START) * 1000)
+        send_to_electron("startup", "Startup complete", startup_timings)
+    except Exception as e:
+        send_to_electron("info", f"Startup preload failed: {str(e)}")
+
+def main():
+    # Ready before torch/whisper are imported: "analyze" works immediately,
+    # the heavy imports (and an optional warm start) happen in the background
+    startup_timings["engineReady"] = round((time.perf_counter() - _PROCESS_START) * 1000)
+    send_to_electron("status", "Engine Ready")
+    threading.Thread(target=_startup_stages, args=(warm_start_enabled(),), daemon=True).start()
+
+    threading.Thread(target=_read_commands, name="commands", daemon=True).start()
+
+    try:
+        with _jobs_cond:
+            while not (_shutting_down and not _pending_jobs and not _active_jobs):
+                _jobs_cond.wait(0.5)
+    except KeyboardInterrupt:
+        # Let running jobs stop at their next window and remove their temp files
+        cancel_all_jobs()
 
 if __name__ == "__main__":
+    # Required for the batch worker processes in the frozen (PyInstaller) build
+    import multiprocessing
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1 and sys.argv[1] in ("run", "watch"):
+        sys.exit(run_headless(sys.argv[1:]))
     main()
\ No newline at end of file
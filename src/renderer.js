@@ -4,6 +4,7 @@ const {
 } = require('electron');
 const path = require('path');
 const fs = require('fs');
+const { pathToFileURL } = require('url');
 
 // --- STATE ---
 let fileQueue = [];
@@ -188,7 +189,7 @@ function renderQueue() {
         if (item.isAudio) {
             thumbHTML = `<div class="thumb-audio">AUDIO</div>`;
         } else {
-            const thumbSrc = item.meta && item.meta.thumbnail ? item.meta.thumbnail : '';
+            const thumbSrc = item.thumbnail || '';
             const thumbAttr = thumbSrc ? `src="${thumbSrc}"` : '';
             thumbHTML = `<img class="file-thumb" ${thumbAttr}>`;
         }
@@ -306,6 +307,12 @@ async function processQueue() {
         profanity: settings.profanity
     };
 
+    // Lets the engine load the next file's model while this one transcribes
+    if (fileQueue.some(x => x.status === 'pending')) {
+        payload.nextModel = globalSettings.model;
+        payload.nextDevice = globalSettings.device;
+    }
+
     ipcRenderer.send('to-python', payload);
 }
 
@@ -375,7 +382,7 @@ convertBtn.addEventListener('click', () => {
     if (isProcessing) return;
     let resetCount = 0;
     fileQueue.forEach(f => {
-        if (f.status === 'done' || f.status === 'error') {
+        if (f.status === 'done' || f.status === 'error' || f.status === 'cancelled') {
             f.status = 'pending';
             resetCount++;
         }
@@ -559,13 +566,22 @@ ipcRenderer.on('python-output', (event, msg) => {
                 item.meta = res.data;
                 renderQueue();
             }
-        } else if (res.type === 'success') {
-            const item = fileQueue.find(x => x.status === 'processing');
+        } else if (res.type === 'thumbnail') {
+            // Arrives after the analysis result; the JPEG is in the engine's cache
+            const item = fileQueue.find(x => x.path === res.data.path);
             if (item) {
-                item.status = 'done';
-                const bar = document.getElementById(`progress-${item.id}`);
-                if (bar) bar.style.width = '100%';
+                item.thumbnail = pathToFileURL(res.data.thumbnailPath).href;
+                renderQueue();
             }
+        } else if (res.type === 'success') {
+            // Only the running file's own result finishes it, not a "render" of a sidecar
+            if (res.data && res.data.sidecarPath) return;
+            const donePath = (res.data && res.data.path) || res.path;
+            const item = fileQueue.find(x => x.status === 'processing' && x.path === donePath);
+            if (!item) return;
+            item.status = 'done';
+            const bar = document.getElementById(`progress-${item.id}`);
+            if (bar) bar.style.width = '100%';
 
             // Remember the last successfully saved output file for auto-open behavior
             if (res.data && res.data.savePath) {
@@ -580,13 +596,27 @@ ipcRenderer.on('python-output', (event, msg) => {
                 if (bar) bar.style.width = res.data + '%';
             }
         } else if (res.type === 'error') {
-            const item = fileQueue.find(x => x.status === 'processing');
+            // Errors name their file; analysis errors for other files, and
+            // errors without a file, must not fail the running item
+            const errorPath = (res.data && res.data.path) || res.path;
+            const item = fileQueue.find(x => x.status === 'processing' && x.path === errorPath);
+            if (!item) {
+                console.error(res.message);
+                return;
+            }
+            item.status = 'error';
+            alert(`Error: ${res.message}`);
+            renderQueue();
+            processQueue();
+        } else if (res.type === 'cancelled') {
+            // Stopped by a "cancel" command; the file can be converted again later
+            const cancelledPath = (res.data && res.data.path) || res.path;
+            const item = fileQueue.find(x => x.status === 'processing' && x.path === cancelledPath);
             if (item) {
-                item.status = 'error';
-                alert(`Error: ${res.message}`);
+                item.status = 'cancelled';
                 renderQueue();
+                processQueue();
             }
-            processQueue();
         }
     } catch (e) {}
 });